@@ -1,15 +1,31 @@
-"""Load API-Bank CSV and compute capability vectors for each API."""
+"""Load API-Bank CSV and compute capability vectors for each API.
+
+Besides the list-of-`APIDoc` loader, this module offers a streaming ingestion
+path (`iter_api_records` / `ingest_api_bank`) for large tool catalogs: rows are
+read as a generator, vectorized in fixed-size chunks and written straight into
+preallocated (optionally memory-mapped) arrays, so peak memory does not grow
+with the catalog.
+"""
 
 from __future__ import annotations
 
 import csv
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import IO, Any, Deque, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 import numpy as np
 
-from text_handling import CAPABILITY_ORDER, compute_keyword_vector, normalize_text
+from text_handling import (
+	CAPABILITY_ORDER,
+	compute_keyword_matrix,
+	compute_keyword_vector,
+	compute_semantic_embeddings,
+	normalize_text,
+)
 
 DEFAULT_CSV = Path(__file__).resolve().parent / "all_apis.csv"
 
@@ -22,6 +38,10 @@ class APIDoc:
 	a_api: np.ndarray
 
 
+# (id, name, composite description)
+APIRecord = Tuple[str, str, str]
+
+
 def _compose_description(row: dict) -> str:
 	parts: List[str] = []
 	for key in ("应用场景", "API名称", "api_info"):
@@ -40,20 +60,308 @@ def compute_api_vector(text: str) -> np.ndarray:
 	return compute_keyword_vector(tokens)
 
 
-def load_api_bank(csv_path: Optional[str] = None) -> List[APIDoc]:
-	path = Path(csv_path) if csv_path else DEFAULT_CSV
-	docs: List[APIDoc] = []
+def _records_from_mapping(obj: Mapping[str, Any], position: int) -> Iterator[APIRecord]:
+	"""Map one catalog entry (API-Bank row, flat tool dict or ToolBench tool) to records."""
+	if "API名称" in obj or "api_info" in obj:
+		yield str(obj.get("id") or ""), str(obj.get("API名称") or obj.get("name") or ""), _compose_description(obj)
+		return
+
+	api_list = obj.get("api_list")
+	if isinstance(api_list, list):
+		# ToolBench tool: one record per API, prefixed by the tool it belongs to.
+		tool = str(obj.get("tool_name") or obj.get("name") or "")
+		tool_desc = str(obj.get("tool_description") or obj.get("description") or "")
+		for j, api in enumerate(api_list):
+			api_name = str(api.get("name") or api.get("api_name") or "")
+			name = f"{tool}.{api_name}" if tool else api_name
+			desc = " | ".join(p for p in (tool_desc, api_name, str(api.get("description") or "")) if p)
+			yield str(api.get("id") or f"{position}.{j}"), name, desc
+		return
+
+	name = str(obj.get("name") or obj.get("api_name") or obj.get("tool_name") or "")
+	desc_parts = (
+		str(obj.get("category") or obj.get("category_name") or ""),
+		name,
+		str(obj.get("description") or obj.get("api_description") or ""),
+	)
+	yield str(obj.get("id") or obj.get("api_id") or position), name, " | ".join(p for p in desc_parts if p)
+
+
+def _iter_json_values(f: IO[str], chunk_size: int = 1 << 16) -> Iterator[Any]:
+	"""Yield the elements of a top-level JSON array (or the single top-level value) incrementally."""
+	decoder = json.JSONDecoder()
+	buf = ""
+	eof = False
+
+	def fill() -> bool:
+		nonlocal buf, eof
+		if eof:
+			return False
+		chunk = f.read(chunk_size)
+		if not chunk:
+			eof = True
+			return False
+		buf += chunk
+		return True
+
+	while not buf.lstrip() and fill():
+		pass
+	buf = buf.lstrip()
+	if not buf:
+		return
+	if buf[0] != "[":
+		while fill():
+			pass
+		yield json.loads(buf)
+		return
+
+	buf = buf[1:]
+	while True:
+		buf = buf.lstrip().lstrip(",").lstrip()
+		if not buf and not fill():
+			raise ValueError("Unterminated JSON array")
+		if not buf:
+			continue
+		if buf[0] == "]":
+			return
+		try:
+			value, end = decoder.raw_decode(buf)
+		except json.JSONDecodeError:
+			if not fill():
+				raise
+			continue
+		# A number may be cut at the chunk edge; make sure a delimiter follows.
+		if end == len(buf) and fill():
+			continue
+		yield value
+		buf = buf[end:]
+
+
+def iter_api_records(path: Optional[str] = None, fmt: Optional[str] = None) -> Iterator[APIRecord]:
+	"""Stream `(id, name, description)` records from a CSV, JSON or JSONL catalog.
+
+	`fmt` defaults to the file suffix (`.csv`, `.json`, `.jsonl`/`.ndjson`).
+	"""
+
+	path = Path(path) if path else DEFAULT_CSV
+	fmt = (fmt or path.suffix.lstrip(".") or "csv").lower()
 
 	with path.open(newline="", encoding="utf-8") as f:
-		reader = csv.DictReader(f)
-		for row in reader:
-			api_id = row.get("id") or ""
-			name = row.get("API名称") or row.get("name") or ""
-			desc = _compose_description(row)
-			a_api = compute_api_vector(desc)
-			docs.append(APIDoc(id=str(api_id), name=name, description=desc, a_api=a_api))
+		if fmt == "csv":
+			for position, row in enumerate(csv.DictReader(f)):
+				yield from _records_from_mapping(row, position)
+		elif fmt in ("jsonl", "ndjson"):
+			for position, line in enumerate(f):
+				if line.strip():
+					yield from _records_from_mapping(json.loads(line), position)
+		elif fmt == "json":
+			for position, obj in enumerate(_iter_json_values(f)):
+				if isinstance(obj, list):
+					for j, item in enumerate(obj):
+						yield from _records_from_mapping(item, j)
+				else:
+					yield from _records_from_mapping(obj, position)
+		else:
+			raise ValueError(f"Unsupported catalog format: {fmt!r}")
+
 
+def load_api_bank(csv_path: Optional[str] = None) -> List[APIDoc]:
+	docs: List[APIDoc] = []
+	for api_id, name, desc in iter_api_records(csv_path, fmt="csv"):
+		docs.append(APIDoc(id=api_id, name=name, description=desc, a_api=compute_api_vector(desc)))
 	return docs
 
 
-__all__ = ["APIDoc", "load_api_bank", "compute_api_vector", "CAPABILITY_ORDER"]
+@dataclass
+class IngestedBank:
+	"""Columnar result of `ingest_api_bank`.
+
+	Descriptions are stored as UTF-8 bytes in one buffer; description i is
+	`desc_buffer[desc_offsets[i]:desc_offsets[i + 1]]`.
+	"""
+
+	ids: List[str]
+	names: List[str]
+	capabilities: np.ndarray
+	desc_offsets: np.ndarray
+	desc_buffer: np.ndarray
+	embeddings: Optional[np.ndarray] = None
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def description(self, i: int) -> str:
+		return bytes(self.desc_buffer[self.desc_offsets[i]:self.desc_offsets[i + 1]]).decode("utf-8")
+
+
+def _chunks(records: Iterable[APIRecord], size: int) -> Iterator[List[APIRecord]]:
+	chunk: List[APIRecord] = []
+	for rec in records:
+		chunk.append(rec)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def vectorize_descriptions(descs: List[str]) -> Tuple[List[str], np.ndarray]:
+	"""Normalization + keyword counting for one chunk (runs in pool workers too)."""
+	normalized = [normalize_text(desc) for desc in descs]
+	return normalized, compute_keyword_matrix([text.split() for text in normalized])
+
+
+def _vectorized_chunks(
+	records: Iterable[APIRecord],
+	chunk_size: int,
+	workers: int,
+) -> Iterator[Tuple[List[APIRecord], List[str], np.ndarray]]:
+	"""Yield `(chunk, normalized texts, capability rows)` in catalog order.
+
+	With `workers > 1` chunks are sharded over a process pool; at most
+	`2 * workers` chunks are in flight so memory stays bounded, and results
+	are consumed in submission order so the output matches the sequential path.
+	"""
+
+	chunks = _chunks(records, max(1, chunk_size))
+	if workers <= 1:
+		for chunk in chunks:
+			normalized, counts = vectorize_descriptions([desc for _, _, desc in chunk])
+			yield chunk, normalized, counts
+		return
+
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		pending: Deque[Tuple[List[APIRecord], Future]] = deque()
+		for chunk in chunks:
+			pending.append((chunk, pool.submit(vectorize_descriptions, [desc for _, _, desc in chunk])))
+			if len(pending) >= 2 * workers:
+				done_chunk, future = pending.popleft()
+				yield (done_chunk, *future.result())
+		while pending:
+			done_chunk, future = pending.popleft()
+			yield (done_chunk, *future.result())
+
+
+def _alloc(out_dir: Optional[Path], name: str, shape: Tuple[int, ...], dtype: Any) -> np.ndarray:
+	if out_dir is None or 0 in shape:
+		# Zero-length files cannot be memory-mapped.
+		return np.zeros(shape, dtype=dtype)
+	return np.lib.format.open_memmap(out_dir / f"{name}.npy", mode="w+", dtype=dtype, shape=shape)
+
+
+def ingest_api_bank(
+	path: Optional[str] = None,
+	fmt: Optional[str] = None,
+	out_dir: Optional[str] = None,
+	chunk_size: int = 1024,
+	with_embeddings: bool = False,
+	workers: int = 1,
+) -> IngestedBank:
+	"""Vectorize a catalog chunk by chunk into preallocated arrays.
+
+	A first streaming pass counts records and description bytes; the second
+	pass fills the arrays `chunk_size` rows at a time. With `out_dir`, the
+	arrays are `.npy` memory maps in that directory (`capabilities.npy`,
+	`embeddings.npy`, `desc_offsets.npy`, `desc_buffer.npy`, plus `ids.jsonl`).
+
+	`workers > 1` runs normalization and keyword counting in a process pool;
+	embeddings are still computed here in batched encoder calls. The result is
+	identical to the sequential build (see `check_parallel_equivalence`).
+	"""
+
+	n_rows = 0
+	n_bytes = 0
+	for _, _, desc in iter_api_records(path, fmt):
+		n_rows += 1
+		n_bytes += len(desc.encode("utf-8"))
+
+	out = Path(out_dir) if out_dir else None
+	if out is not None:
+		out.mkdir(parents=True, exist_ok=True)
+
+	capabilities = _alloc(out, "capabilities", (n_rows, len(CAPABILITY_ORDER)), np.float64)
+	desc_offsets = _alloc(out, "desc_offsets", (n_rows + 1,), np.int64)
+	desc_buffer = _alloc(out, "desc_buffer", (n_bytes,), np.uint8)
+	embeddings: Optional[np.ndarray] = None
+	ids: List[str] = []
+	names: List[str] = []
+
+	id_file = (out / "ids.jsonl").open("w", encoding="utf-8") if out is not None else None
+	try:
+		row = 0
+		offset = 0
+		for chunk, normalized, counts in _vectorized_chunks(iter_api_records(path, fmt), chunk_size, workers):
+			end = row + len(chunk)
+			capabilities[row:end] = counts
+
+			if with_embeddings:
+				vecs = compute_semantic_embeddings(normalized, batch_size=min(len(chunk), 64), persist=True)
+				if embeddings is None:
+					embeddings = _alloc(out, "embeddings", (n_rows, vecs.shape[1]), np.float64)
+				embeddings[row:end] = vecs
+
+			for i, (api_id, name, desc) in enumerate(chunk):
+				raw = desc.encode("utf-8")
+				desc_offsets[row + i] = offset
+				desc_buffer[offset:offset + len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+				offset += len(raw)
+				ids.append(api_id)
+				names.append(name)
+				if id_file is not None:
+					id_file.write(json.dumps({"id": api_id, "name": name}, ensure_ascii=False) + "\n")
+			row = end
+		desc_offsets[row] = offset
+	finally:
+		if id_file is not None:
+			id_file.close()
+
+	for arr in (capabilities, desc_offsets, desc_buffer, embeddings):
+		if isinstance(arr, np.memmap):
+			arr.flush()
+
+	return IngestedBank(
+		ids=ids,
+		names=names,
+		capabilities=capabilities,
+		desc_offsets=desc_offsets,
+		desc_buffer=desc_buffer,
+		embeddings=embeddings,
+	)
+
+
+def check_parallel_equivalence(
+	path: Optional[str] = None,
+	fmt: Optional[str] = None,
+	workers: int = 2,
+	chunk_size: int = 1024,
+	with_embeddings: bool = False,
+) -> List[str]:
+	"""Build sequentially and with `workers` processes; return the fields whose bytes differ."""
+	seq = ingest_api_bank(path, fmt, chunk_size=chunk_size, with_embeddings=with_embeddings)
+	par = ingest_api_bank(path, fmt, chunk_size=chunk_size, with_embeddings=with_embeddings, workers=workers)
+
+	mismatched: List[str] = []
+	for field in ("ids", "names"):
+		if getattr(seq, field) != getattr(par, field):
+			mismatched.append(field)
+	for field in ("capabilities", "desc_offsets", "desc_buffer", "embeddings"):
+		a, b = getattr(seq, field), getattr(par, field)
+		if (a is None) != (b is None):
+			mismatched.append(field)
+		elif a is not None and (a.shape != b.shape or a.dtype != b.dtype or a.tobytes() != b.tobytes()):
+			mismatched.append(field)
+	return mismatched
+
+
+__all__ = [
+	"APIDoc",
+	"APIRecord",
+	"IngestedBank",
+	"check_parallel_equivalence",
+	"load_api_bank",
+	"compute_api_vector",
+	"ingest_api_bank",
+	"iter_api_records",
+	"vectorize_descriptions",
+	"CAPABILITY_ORDER",
+]
@@ -0,0 +1,635 @@
+"""Precomputed API-bank index, compiled once to disk and reused across calls.
+
+The index is a struct-of-arrays catalog: a float32 `a_API` capability matrix,
+an optional float32 embedding matrix, and ids / names / descriptions stored
+as `TextColumn`s (one UTF-8 buffer plus offsets, decoded only on access).
+`APIRow` is a slotted per-row view that keeps `api.id` / `api.name` access.
+
+It is keyed by a fingerprint of the CSV contents, `KEYWORDS`,
+`CAPABILITY_ORDER` and the embedding backend, so any change to those inputs
+triggers a rebuild automatically. On disk the index is a directory of `.npy`
+files that is memory-mapped on load.
+
+Every row also carries a content hash of its `(id, name, description)`
+record. When only the catalog rows change, the new index is derived from the
+previous one (`sync_api_index`) and only added or edited rows are
+re-vectorized. `LiveAPIIndex` exposes the same machinery as upsert / delete /
+sync operations that publish immutable snapshots.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api_bank_load import (
+	DEFAULT_CSV,
+	APIDoc,
+	APIRecord,
+	check_parallel_equivalence,
+	ingest_api_bank,
+	iter_api_records,
+	vectorize_descriptions,
+)
+from keywords_conf import KEYWORDS
+from text_handling import CAPABILITY_ORDER, compute_semantic_embeddings, embedding_backend
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".index_cache"
+
+# Bump when the on-disk layout changes so stale artifacts are ignored.
+INDEX_FORMAT_VERSION = 3
+
+ROW_HASH_BYTES = 16
+
+
+class TextColumn:
+	"""Strings packed into one UTF-8 buffer.
+
+	Distinct values are stored once; row i holds the value `codes[i]`, whose
+	bytes are `buffer[offsets[code]:offsets[code + 1]]`.
+	"""
+
+	__slots__ = ("buffer", "offsets", "codes")
+
+	def __init__(self, buffer: np.ndarray, offsets: np.ndarray, codes: np.ndarray) -> None:
+		self.buffer = buffer
+		self.offsets = offsets
+		self.codes = codes
+
+	@classmethod
+	def from_strings(cls, values: Iterable[str], dedupe: bool = True) -> "TextColumn":
+		table: Dict[str, int] = {}
+		chunks: List[bytes] = []
+		codes: List[int] = []
+		for value in values:
+			code = table.get(value) if dedupe else None
+			if code is None:
+				code = len(chunks)
+				chunks.append(value.encode("utf-8"))
+				if dedupe:
+					table[value] = code
+			codes.append(code)
+		offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+		if chunks:
+			np.cumsum([len(c) for c in chunks], out=offsets[1:])
+		return cls(
+			buffer=np.frombuffer(b"".join(chunks), dtype=np.uint8),
+			offsets=offsets,
+			codes=np.asarray(codes, dtype=np.int32),
+		)
+
+	@classmethod
+	def from_buffer(cls, buffer: np.ndarray, offsets: np.ndarray) -> "TextColumn":
+		"""Wrap an existing buffer/offsets pair with one value per row."""
+		return cls(buffer=buffer, offsets=offsets, codes=np.arange(len(offsets) - 1, dtype=np.int32))
+
+	def __len__(self) -> int:
+		return int(self.codes.shape[0])
+
+	def _decode(self, code: int) -> str:
+		return bytes(self.buffer[self.offsets[code]:self.offsets[code + 1]]).decode("utf-8")
+
+	def __getitem__(self, key):
+		"""`column[i]` -> str; `column[array]` -> object array of str with the same shape."""
+		if isinstance(key, (int, np.integer)):
+			return self._decode(int(self.codes[key]))
+		codes = self.codes[key]
+		out = np.empty(codes.shape, dtype=object)
+		flat = out.reshape(-1)
+		for j, code in enumerate(np.asarray(codes).reshape(-1)):
+			flat[j] = self._decode(int(code))
+		return out
+
+	def __iter__(self) -> Iterator[str]:
+		for code in self.codes:
+			yield self._decode(int(code))
+
+	@property
+	def nbytes(self) -> int:
+		return int(self.buffer.nbytes + self.offsets.nbytes + self.codes.nbytes)
+
+
+class APIRow:
+	"""Lightweight view of one API in an `APIIndex`; fields are decoded on access."""
+
+	__slots__ = ("_index", "_pos")
+
+	def __init__(self, index: "APIIndex", pos: int) -> None:
+		self._index = index
+		self._pos = pos
+
+	@property
+	def pos(self) -> int:
+		return self._pos
+
+	@property
+	def id(self) -> str:
+		return self._index.ids[self._pos]
+
+	@property
+	def name(self) -> str:
+		return self._index.names[self._pos]
+
+	@property
+	def description(self) -> str:
+		return self._index.descriptions[self._pos]
+
+	@property
+	def a_api(self) -> np.ndarray:
+		return self._index.capabilities[self._pos]
+
+	@property
+	def z_api(self) -> Optional[np.ndarray]:
+		emb = self._index.embeddings
+		return None if emb is None else emb[self._pos]
+
+	def __repr__(self) -> str:
+		return f"APIRow(id={self.id!r}, name={self.name!r})"
+
+
+@dataclass
+class APIIndex:
+	fingerprint: str
+	ids: TextColumn
+	names: TextColumn
+	descriptions: TextColumn
+	capabilities: np.ndarray
+	embeddings: Optional[np.ndarray] = None
+	# `(n, ROW_HASH_BYTES)` uint8 content hashes, and the `vector_config` the rows were built with.
+	row_hashes: Optional[np.ndarray] = None
+	config: str = ""
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def row(self, i: int) -> APIRow:
+		return APIRow(self, int(i))
+
+	def doc(self, i: int) -> APIDoc:
+		"""Materialize row i as a standalone `APIDoc`."""
+		return APIDoc(
+			id=self.ids[i],
+			name=self.names[i],
+			description=self.descriptions[i],
+			a_api=np.asarray(self.capabilities[i], dtype=float),
+		)
+
+
+def vector_config(with_embeddings: bool = False) -> str:
+	"""Hash of every input besides the catalog rows that shapes the vectors."""
+	h = hashlib.sha256()
+	h.update(f"v{INDEX_FORMAT_VERSION}\0".encode("utf-8"))
+	h.update(json.dumps(KEYWORDS, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+	h.update(b"\0")
+	h.update(",".join(CAPABILITY_ORDER).encode("utf-8"))
+	h.update(b"\0")
+	h.update((embedding_backend() if with_embeddings else "none").encode("utf-8"))
+	return h.hexdigest()
+
+
+def index_fingerprint(csv_path: Optional[str] = None, with_embeddings: bool = False) -> str:
+	"""Hash every input that influences the compiled index."""
+	path = Path(csv_path) if csv_path else DEFAULT_CSV
+	h = hashlib.sha256()
+	h.update(vector_config(with_embeddings).encode("utf-8"))
+	h.update(b"\0")
+	h.update(path.read_bytes())
+	return h.hexdigest()
+
+
+def record_hash(record: APIRecord) -> bytes:
+	"""Content hash of one `(id, name, description)` record."""
+	h = hashlib.blake2b(digest_size=ROW_HASH_BYTES)
+	for value in record:
+		h.update(value.encode("utf-8"))
+		h.update(b"\0")
+	return h.digest()
+
+
+def _pack_hashes(digests: Sequence[bytes]) -> np.ndarray:
+	return np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(len(digests), ROW_HASH_BYTES)
+
+
+def build_api_index(csv_path: Optional[str] = None, with_embeddings: bool = False, workers: int = 1) -> APIIndex:
+	"""Parse the CSV and vectorize every API (no caching); `workers > 1` shards over processes."""
+	fingerprint = index_fingerprint(csv_path, with_embeddings)
+	bank = ingest_api_bank(csv_path, fmt="csv", with_embeddings=with_embeddings, workers=workers)
+	digests = [record_hash((bank.ids[i], bank.names[i], bank.description(i))) for i in range(len(bank))]
+
+	return APIIndex(
+		fingerprint=fingerprint,
+		ids=TextColumn.from_strings(bank.ids),
+		names=TextColumn.from_strings(bank.names),
+		descriptions=TextColumn.from_buffer(bank.desc_buffer, bank.desc_offsets),
+		capabilities=np.ascontiguousarray(bank.capabilities, dtype=np.float32),
+		embeddings=None if bank.embeddings is None else np.ascontiguousarray(bank.embeddings, dtype=np.float32),
+		row_hashes=_pack_hashes(digests),
+		config=vector_config(with_embeddings),
+	)
+
+
+@dataclass
+class IndexDiff:
+	"""Row counts touched by an incremental update."""
+
+	added: int = 0
+	updated: int = 0
+	deleted: int = 0
+	unchanged: int = 0
+
+	@property
+	def changed(self) -> bool:
+		return bool(self.added or self.updated or self.deleted)
+
+
+# One output row: its record, content hash and position in the base index (-1 = vectorize).
+_Row = Tuple[APIRecord, bytes, int]
+
+
+def _row_table(index: APIIndex) -> Dict[str, Tuple[int, bytes]]:
+	"""API id -> (position, content hash) for the rows of `index`."""
+	if index.row_hashes is not None:
+		packed = np.ascontiguousarray(index.row_hashes).tobytes()
+		digests = [packed[i * ROW_HASH_BYTES:(i + 1) * ROW_HASH_BYTES] for i in range(len(index))]
+	else:
+		digests = [record_hash((index.ids[i], index.names[i], index.descriptions[i])) for i in range(len(index))]
+	return {api_id: (i, digest) for i, (api_id, digest) in enumerate(zip(index.ids, digests))}
+
+
+def _splice(base: APIIndex, rows: List[_Row], with_embeddings: bool, fingerprint: Optional[str]) -> APIIndex:
+	"""Assemble a new index from `rows`, copying vectors from `base` and vectorizing only new rows."""
+	n = len(rows)
+	positions = np.fromiter((pos for _, _, pos in rows), dtype=np.int64, count=n)
+	reused = np.flatnonzero(positions >= 0)
+	fresh = np.flatnonzero(positions < 0)
+
+	capabilities = np.empty((n, len(CAPABILITY_ORDER)), dtype=np.float32)
+	capabilities[reused] = base.capabilities[positions[reused]]
+	normalized: List[str] = []
+	if fresh.size:
+		normalized, counts = vectorize_descriptions([rows[i][0][2] for i in fresh])
+		capabilities[fresh] = counts
+
+	embeddings: Optional[np.ndarray] = None
+	if with_embeddings and n:
+		vecs = compute_semantic_embeddings(normalized, batch_size=min(fresh.size, 64), persist=True) if fresh.size else None
+		dim = base.embeddings.shape[1] if base.embeddings is not None else vecs.shape[1]
+		embeddings = np.empty((n, dim), dtype=np.float32)
+		if reused.size:
+			embeddings[reused] = base.embeddings[positions[reused]]
+		if vecs is not None:
+			embeddings[fresh] = vecs
+
+	row_hashes = _pack_hashes([digest for _, digest, _ in rows])
+	config = vector_config(with_embeddings)
+	if fingerprint is None:
+		# Derived snapshots are identified by their contents.
+		h = hashlib.sha256(config.encode("utf-8"))
+		h.update(row_hashes.tobytes())
+		fingerprint = h.hexdigest()
+
+	return APIIndex(
+		fingerprint=fingerprint,
+		ids=TextColumn.from_strings(record[0] for record, _, _ in rows),
+		names=TextColumn.from_strings(record[1] for record, _, _ in rows),
+		descriptions=TextColumn.from_strings((record[2] for record, _, _ in rows), dedupe=False),
+		capabilities=capabilities,
+		embeddings=embeddings,
+		row_hashes=row_hashes,
+		config=config,
+	)
+
+
+def _can_derive(base: APIIndex, with_embeddings: bool) -> bool:
+	return bool(base.config) and base.config == vector_config(with_embeddings)
+
+
+def sync_api_index(
+	base: APIIndex,
+	path: Optional[str] = None,
+	fmt: Optional[str] = None,
+	with_embeddings: Optional[bool] = None,
+	fingerprint: Optional[str] = None,
+) -> Tuple[APIIndex, IndexDiff]:
+	"""Bring `base` in line with the catalog at `path`, in catalog order.
+
+	Rows whose content hash is unchanged keep their vectors; added and edited
+	rows are vectorized and rows missing from the catalog are dropped. The
+	result matches a full `build_api_index` of the same catalog.
+	"""
+
+	if with_embeddings is None:
+		with_embeddings = base.embeddings is not None
+	table = _row_table(base) if _can_derive(base, with_embeddings) else {}
+	diff = IndexDiff()
+	rows: List[_Row] = []
+	seen = set()
+	for record in iter_api_records(path, fmt):
+		digest = record_hash(record)
+		old = table.get(record[0])
+		if old is None:
+			diff.added += 1
+			pos = -1
+		elif old[1] == digest:
+			diff.unchanged += 1
+			pos = old[0]
+		else:
+			diff.updated += 1
+			pos = -1
+		seen.add(record[0])
+		rows.append((record, digest, pos))
+	diff.deleted = sum(1 for api_id in table if api_id not in seen)
+	return _splice(base, rows, with_embeddings, fingerprint), diff
+
+
+def update_api_index(
+	base: APIIndex,
+	upserts: Iterable[APIRecord] = (),
+	deletes: Iterable[str] = (),
+	with_embeddings: Optional[bool] = None,
+) -> Tuple[APIIndex, IndexDiff]:
+	"""Apply upserts and deletes by API id; edited rows stay in place, new rows are appended."""
+	if with_embeddings is None:
+		with_embeddings = base.embeddings is not None
+	if not _can_derive(base, with_embeddings):
+		raise ValueError("Index was built with a different vector configuration; rebuild it instead")
+
+	table = _row_table(base)
+	changes: Dict[str, Tuple[APIRecord, bytes]] = {}
+	for record in upserts:
+		changes[record[0]] = (record, record_hash(record))
+	removed = set(deletes)
+
+	diff = IndexDiff()
+	rows: List[_Row] = []
+	for pos, api_id in enumerate(base.ids):
+		if api_id in removed:
+			diff.deleted += 1
+			continue
+		change = changes.pop(api_id, None)
+		if change is not None and change[1] != table[api_id][1]:
+			diff.updated += 1
+			rows.append((change[0], change[1], -1))
+		else:
+			diff.unchanged += 1
+			rows.append(((api_id, base.names[pos], base.descriptions[pos]), table[api_id][1], pos))
+	for api_id, (record, digest) in changes.items():
+		if api_id not in removed:
+			diff.added += 1
+			rows.append((record, digest, -1))
+	if not diff.changed:
+		return base, diff
+	return _splice(base, rows, with_embeddings, None), diff
+
+
+class LiveAPIIndex:
+	"""Updatable API index published as immutable snapshots.
+
+	Writers are serialized; each update builds a complete new `APIIndex` and
+	swaps it in with one reference assignment, so a reader holding
+	`snapshot()` keeps a consistent view while the next one is prepared.
+	"""
+
+	def __init__(self, base: APIIndex, with_embeddings: Optional[bool] = None) -> None:
+		self.with_embeddings = base.embeddings is not None if with_embeddings is None else with_embeddings
+		self._snapshot = base
+		self._write_lock = threading.Lock()
+
+	@classmethod
+	def load(cls, csv_path: Optional[str] = None, with_embeddings: bool = False, cache_dir: Optional[str] = None) -> "LiveAPIIndex":
+		return cls(load_api_index(csv_path, with_embeddings, cache_dir), with_embeddings)
+
+	def snapshot(self) -> APIIndex:
+		return self._snapshot
+
+	def upsert(self, records: Iterable[APIRecord]) -> IndexDiff:
+		with self._write_lock:
+			self._snapshot, diff = update_api_index(self._snapshot, upserts=records, with_embeddings=self.with_embeddings)
+			return diff
+
+	def delete(self, ids: Iterable[str]) -> IndexDiff:
+		with self._write_lock:
+			self._snapshot, diff = update_api_index(self._snapshot, deletes=ids, with_embeddings=self.with_embeddings)
+			return diff
+
+	def sync(self, path: Optional[str] = None, fmt: Optional[str] = None) -> IndexDiff:
+		"""Diff against a catalog file and publish the result."""
+		with self._write_lock:
+			index, diff = sync_api_index(self._snapshot, path, fmt, self.with_embeddings)
+			if diff.changed:
+				self._snapshot = index
+			return diff
+
+	def save(self, cache_dir: Optional[str] = None) -> Path:
+		"""Persist the current snapshot as an index artifact."""
+		index = self._snapshot
+		path = _artifact_path(Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR, index.fingerprint)
+		if not path.exists():
+			_save_index(index, path)
+		return path
+
+
+_TEXT_COLUMNS = ("ids", "names", "descriptions")
+
+
+def _artifact_path(cache_dir: Path, fingerprint: str) -> Path:
+	return cache_dir / f"api_index_{fingerprint[:16]}"
+
+
+def _save_index(index: APIIndex, path: Path) -> None:
+	path.parent.mkdir(parents=True, exist_ok=True)
+	arrays = {"capabilities": index.capabilities}
+	if index.embeddings is not None:
+		arrays["embeddings"] = index.embeddings
+	if index.row_hashes is not None:
+		arrays["row_hashes"] = index.row_hashes
+	for name in _TEXT_COLUMNS:
+		column: TextColumn = getattr(index, name)
+		arrays[f"{name}_buffer"] = column.buffer
+		arrays[f"{name}_offsets"] = column.offsets
+		arrays[f"{name}_codes"] = column.codes
+
+	# Write into a temp directory and rename so concurrent readers never see a partial artifact.
+	tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+	shutil.rmtree(tmp, ignore_errors=True)
+	tmp.mkdir()
+	for name, arr in arrays.items():
+		np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+	(tmp / "fingerprint").write_text(index.fingerprint, encoding="utf-8")
+	(tmp / "config").write_text(index.config, encoding="utf-8")
+	try:
+		os.replace(tmp, path)
+	except OSError:
+		# Another process published the same artifact first.
+		shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read_index(path: Path, fingerprint: str) -> Optional[APIIndex]:
+	try:
+		if (path / "fingerprint").read_text(encoding="utf-8") != fingerprint:
+			return None
+
+		def load(name: str) -> np.ndarray:
+			return np.load(path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+
+		columns = {
+			name: TextColumn(load(f"{name}_buffer"), load(f"{name}_offsets"), load(f"{name}_codes"))
+			for name in _TEXT_COLUMNS
+		}
+		return APIIndex(
+			fingerprint=fingerprint,
+			capabilities=load("capabilities"),
+			embeddings=load("embeddings") if (path / "embeddings.npy").exists() else None,
+			row_hashes=load("row_hashes") if (path / "row_hashes.npy").exists() else None,
+			config=(path / "config").read_text(encoding="utf-8") if (path / "config").exists() else "",
+			**columns,
+		)
+	except (OSError, KeyError, ValueError):
+		return None
+
+
+def _latest_pointer(cache_dir: Path, key: Tuple[str, bool]) -> Path:
+	"""File naming the newest artifact built for one (catalog path, with_embeddings) pair."""
+	digest = hashlib.sha256(f"{key[0]}\0{int(key[1])}".encode("utf-8")).hexdigest()[:16]
+	return cache_dir / f"latest_{digest}"
+
+
+def _read_latest(cache_dir: Path, key: Tuple[str, bool]) -> Optional[APIIndex]:
+	try:
+		fingerprint = _latest_pointer(cache_dir, key).read_text(encoding="utf-8").strip()
+	except OSError:
+		return None
+	return _read_index(_artifact_path(cache_dir, fingerprint), fingerprint)
+
+
+def _publish_latest(cache_dir: Path, key: Tuple[str, bool], fingerprint: str) -> None:
+	pointer = _latest_pointer(cache_dir, key)
+	try:
+		previous = pointer.read_text(encoding="utf-8").strip()
+	except OSError:
+		previous = ""
+	if previous == fingerprint:
+		return
+	tmp = pointer.with_name(f"{pointer.name}.{os.getpid()}.tmp")
+	tmp.write_text(fingerprint, encoding="utf-8")
+	os.replace(tmp, pointer)
+	if previous:
+		# Superseded artifact; processes that still map it keep their open files.
+		shutil.rmtree(_artifact_path(cache_dir, previous), ignore_errors=True)
+
+
+_INDEX_CACHE: Dict[Tuple[str, bool], Tuple[Tuple[int, int], APIIndex]] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def load_api_index(
+	csv_path: Optional[str] = None,
+	with_embeddings: bool = False,
+	cache_dir: Optional[str] = None,
+	workers: int = 1,
+) -> APIIndex:
+	"""Return the compiled index, loading or rebuilding it at most once per input change.
+
+	Within a process the index is reused while the CSV's size and mtime are
+	unchanged; otherwise the fingerprint is recomputed and the on-disk artifact
+	is reused. Without a matching artifact, the previous index for this CSV (in
+	memory or the last one saved) is synced row by row when its vector
+	configuration still applies, and rebuilt with `workers` processes otherwise.
+	"""
+
+	path = (Path(csv_path) if csv_path else DEFAULT_CSV).resolve()
+	stat = path.stat()
+	signature = (stat.st_size, stat.st_mtime_ns)
+	key = (str(path), with_embeddings)
+
+	with _INDEX_LOCK:
+		cached = _INDEX_CACHE.get(key)
+		if cached is not None and cached[0] == signature:
+			return cached[1]
+
+		fingerprint = index_fingerprint(str(path), with_embeddings)
+		if cached is not None and cached[1].fingerprint == fingerprint:
+			_INDEX_CACHE[key] = (signature, cached[1])
+			return cached[1]
+
+		root = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+		artifact = _artifact_path(root, fingerprint)
+		index = _read_index(artifact, fingerprint) if artifact.exists() else None
+		if index is None:
+			base = cached[1] if cached is not None else _read_latest(root, key)
+			if base is not None and _can_derive(base, with_embeddings):
+				index, _ = sync_api_index(base, str(path), "csv", with_embeddings, fingerprint)
+			else:
+				index = build_api_index(str(path), with_embeddings, workers)
+			try:
+				_save_index(index, artifact)
+			except OSError:
+				# Read-only checkouts still work; they just rebuild once per process.
+				pass
+		try:
+			_publish_latest(root, key, fingerprint)
+		except OSError:
+			pass
+
+		_INDEX_CACHE[key] = (signature, index)
+		return index
+
+
+def clear_index_cache() -> None:
+	"""Drop in-process indexes (on-disk artifacts are kept)."""
+	with _INDEX_LOCK:
+		_INDEX_CACHE.clear()
+
+
+def main() -> None:
+	import argparse
+	import time
+
+	parser = argparse.ArgumentParser(description="Compile the API-bank index ahead of time.")
+	parser.add_argument("--csv", default=None, help="API catalog CSV (defaults to all_apis.csv)")
+	parser.add_argument("--embeddings", action="store_true", help="also embed API descriptions")
+	parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="build processes")
+	parser.add_argument("--cache-dir", default=None, help="artifact directory")
+	parser.add_argument("--check", action="store_true", help="verify the parallel build is byte-identical to the sequential one")
+	args = parser.parse_args()
+
+	if args.check:
+		mismatched = check_parallel_equivalence(args.csv, fmt="csv", workers=args.workers, with_embeddings=args.embeddings)
+		if mismatched:
+			print("Parallel build differs in:", ", ".join(mismatched))
+			raise SystemExit(1)
+		print(f"Parallel build ({args.workers} workers) is byte-identical to the sequential build.")
+
+	start = time.perf_counter()
+	index = load_api_index(args.csv, args.embeddings, args.cache_dir, args.workers)
+	print(f"Index {index.fingerprint[:16]}: {len(index)} APIs in {time.perf_counter() - start:.3f}s")
+
+
+__all__ = [
+	"APIIndex",
+	"APIRow",
+	"IndexDiff",
+	"LiveAPIIndex",
+	"TextColumn",
+	"DEFAULT_CACHE_DIR",
+	"build_api_index",
+	"clear_index_cache",
+	"index_fingerprint",
+	"load_api_index",
+	"record_hash",
+	"sync_api_index",
+	"update_api_index",
+	"vector_config",
+]
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,329 @@
+"""API-Bank evaluation and latency benchmark for the tool-selection pipeline.
+
+Usage:
+	python benchmark.py samples.json [--output results.json] [--lam 1.0]
+
+Samples use the API-Bank JSON layout described in the readme
+(`{"query": ..., "apis": [...], "gold_api": ...}`), either as a JSON array or
+as JSONL. Every query goes through `process_task` + `score_apis` against the
+full API bank; a prediction counts as correct when the gold API matches the
+predicted API's id, name, class name (`类名`) or module file name.
+
+`--quantization` additionally searches the API embeddings (in `z_T` space)
+at every storage precision and reports memory, latency, recall against the
+full-precision results and gold accuracy.
+
+`--lams 0.1 0.5 1 2 5` runs a λ sweep instead: tasks are vectorized once and
+every λ is scored from shared similarity components (see `lambda_sweep`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import platform
+import re
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from api_bank_load import DEFAULT_CSV
+from api_index import load_api_index
+from lambda_sweep import DEFAULT_LAMS, FusionComponents
+from quantization import PRECISIONS
+from semantic_index import SemanticIndex, api_vectors
+from text_handling import process_task, process_tasks
+from tool_usage import rerank_path, score_apis
+
+DEFAULT_KS = (1, 3, 5)
+
+
+def _alias_key(value: str) -> str:
+	return re.sub(r"[^0-9a-z一-鿿]", "", str(value).lower())
+
+
+def load_samples(path: str) -> List[Dict[str, Any]]:
+	"""Read `(query, gold_api)` samples from a JSON array/object or a JSONL file."""
+	text = Path(path).read_text(encoding="utf-8")
+	if Path(path).suffix.lower() in (".jsonl", ".ndjson"):
+		raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+	else:
+		data = json.loads(text)
+		raw = data if isinstance(data, list) else [data]
+
+	samples = []
+	for item in raw:
+		query = item.get("query") or item.get("input") or item.get("task")
+		gold = item.get("gold_api") or item.get("api_name") or item.get("gold")
+		if query and gold:
+			samples.append({"query": str(query), "gold_api": str(gold)})
+	return samples
+
+
+def load_api_aliases(csv_path: Optional[str] = None) -> Dict[str, Set[str]]:
+	"""Map API id -> normalized names it can be referred to by in gold labels."""
+	path = Path(csv_path) if csv_path else DEFAULT_CSV
+	aliases: Dict[str, Set[str]] = {}
+	with path.open(newline="", encoding="utf-8") as f:
+		for row in csv.DictReader(f):
+			names = {row.get("id"), row.get("API名称"), row.get("name"), row.get("类名")}
+			if row.get("路径"):
+				names.add(Path(row["路径"]).stem)
+			aliases[str(row.get("id") or "")] = {_alias_key(n) for n in names if n}
+	return aliases
+
+
+def _percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+	if not samples_ms:
+		return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+	arr = np.asarray(samples_ms, dtype=float)
+	p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+	return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(arr.mean())}
+
+
+def peak_rss_mb() -> float:
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is KiB on Linux and bytes on macOS.
+	return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _first_hit(ranked_ids: Sequence[str], gold_api: str, aliases: Dict[str, Set[str]]) -> Optional[int]:
+	gold = _alias_key(gold_api)
+	return next((r for r, api_id in enumerate(ranked_ids) if gold in aliases.get(api_id, ())), None)
+
+
+def run_benchmark(
+	samples: Sequence[Dict[str, Any]],
+	lam: float = 1.0,
+	ks: Sequence[int] = DEFAULT_KS,
+	warmup: int = 3,
+) -> Dict[str, Any]:
+	"""Evaluate accuracy@k and per-stage latency over `samples`."""
+
+	aliases = load_api_aliases()
+	max_k = max(ks)
+
+	# Warm-up: build/load the index and the encoder outside the timed region.
+	load_api_index()
+	for sample in samples[:warmup]:
+		score_apis(process_task(sample["query"], lam).a_t, top_k=max_k)
+
+	encode_ms: List[float] = []
+	score_ms: List[float] = []
+	total_ms: List[float] = []
+	hits = {k: 0 for k in ks}
+	predictions = []
+
+	wall_start = time.perf_counter()
+	for sample in samples:
+		t0 = time.perf_counter()
+		vectors = process_task(sample["query"], lam)
+		t1 = time.perf_counter()
+		ranked = score_apis(vectors.a_t, vectors.z_sem, top_k=max_k)
+		t2 = time.perf_counter()
+
+		encode_ms.append((t1 - t0) * 1000)
+		score_ms.append((t2 - t1) * 1000)
+		total_ms.append((t2 - t0) * 1000)
+
+		ranked_ids = [api.id for api, _ in ranked]
+		first_hit = _first_hit(ranked_ids, sample["gold_api"], aliases)
+		for k in ks:
+			if first_hit is not None and first_hit < k:
+				hits[k] += 1
+		predictions.append({"query": sample["query"], "gold_api": sample["gold_api"], "top": ranked_ids, "rank": first_hit})
+	wall = time.perf_counter() - wall_start
+
+	n = len(samples)
+	return {
+		"n_samples": n,
+		"lam": lam,
+		"accuracy": {f"top{k}": (hits[k] / n if n else 0.0) for k in ks},
+		"latency_ms": {
+			"encode": _percentiles(encode_ms),
+			"score": _percentiles(score_ms),
+			"total": _percentiles(total_ms),
+		},
+		"throughput_qps": (n / wall) if wall > 0 else 0.0,
+		"peak_rss_mb": peak_rss_mb(),
+		"predictions": predictions,
+	}
+
+
+def quantization_report(
+	samples: Sequence[Dict[str, Any]],
+	lam: float = 1.0,
+	ks: Sequence[int] = DEFAULT_KS,
+	rerank: int = 32,
+) -> List[Dict[str, Any]]:
+	"""Recall-vs-memory of quantized API embedding storage for `z_T` retrieval.
+
+	Recall@k is measured against the full-precision top-k; quantized modes
+	shortlist `rerank` candidates and re-rank them exactly.
+	"""
+
+	aliases = load_api_aliases()
+	max_k = max(ks)
+	index = load_api_index(with_embeddings=True)
+	queries = process_tasks([sample["query"] for sample in samples], lam=lam).z_t
+
+	reference: Optional[np.ndarray] = None
+	rows = []
+	for precision in PRECISIONS:
+		vectors = api_vectors(index.embeddings, index.capabilities, lam, lazy=precision != "full")
+		path = str(rerank_path(index, lam)) if precision != "full" else None
+		sem = SemanticIndex(vectors, index.ids, precision=precision, rerank=rerank, rerank_path=path)
+		sem.top_k(queries[:1], max_k)
+
+		latencies: List[float] = []
+		found = []
+		for q in queries:
+			t0 = time.perf_counter()
+			idx, _ = sem.top_k(q, max_k)
+			latencies.append((time.perf_counter() - t0) * 1000)
+			found.append(idx[0])
+		found_arr = np.asarray(found)
+		if reference is None:
+			reference = found_arr
+
+		recall = {}
+		hits = {k: 0 for k in ks}
+		for q, sample in enumerate(samples):
+			first_hit = _first_hit([index.ids[i] for i in found_arr[q] if i >= 0], sample["gold_api"], aliases)
+			for k in ks:
+				if first_hit is not None and first_hit < k:
+					hits[k] += 1
+		n = len(samples)
+		for k in ks:
+			overlap = [len(set(found_arr[q, :k]) & set(reference[q, :k])) / k for q in range(n)]
+			recall[f"top{k}"] = float(np.mean(overlap)) if n else 0.0
+		rows.append({
+			"precision": precision,
+			"memory_mb": sem.nbytes / (1024 * 1024),
+			"bytes_per_api": sem.nbytes / max(1, len(sem)),
+			"recall": recall,
+			"accuracy": {f"top{k}": (hits[k] / n if n else 0.0) for k in ks},
+			"latency_ms": _percentiles(latencies),
+		})
+	return rows
+
+
+def run_lambda_sweep(
+	samples: Sequence[Dict[str, Any]],
+	lams: Sequence[float] = DEFAULT_LAMS,
+	ks: Sequence[int] = DEFAULT_KS,
+) -> Dict[str, Any]:
+	"""Accuracy@k of fused `z_T` retrieval for every λ, encoding each task once."""
+
+	aliases = load_api_aliases()
+	max_k = max(ks)
+	index = load_api_index(with_embeddings=True)
+	n = len(samples)
+
+	t0 = time.perf_counter()
+	batch = process_tasks([sample["query"] for sample in samples])
+	t1 = time.perf_counter()
+	components = FusionComponents.from_vectors(batch.z_sem, batch.a_t, index.embeddings, index.capabilities)
+	t2 = time.perf_counter()
+
+	rows = []
+	for lam in lams:
+		start = time.perf_counter()
+		idx, _ = components.top_k(lam, max_k)
+		rank_ms = (time.perf_counter() - start) * 1000
+		hits = {k: 0 for k in ks}
+		for q, sample in enumerate(samples):
+			first_hit = _first_hit([index.ids[i] for i in idx[q]], sample["gold_api"], aliases)
+			for k in ks:
+				if first_hit is not None and first_hit < k:
+					hits[k] += 1
+		rows.append({
+			"lam": lam,
+			"accuracy": {f"top{k}": (hits[k] / n if n else 0.0) for k in ks},
+			"rank_ms": rank_ms,
+			"rank_ms_per_query": rank_ms / n if n else 0.0,
+		})
+	return {
+		"n_samples": n,
+		"encode_ms": (t1 - t0) * 1000,
+		"components_ms": (t2 - t1) * 1000,
+		"lams": rows,
+		"peak_rss_mb": peak_rss_mb(),
+	}
+
+
+def _print_sweep(sweep: Dict[str, Any]) -> None:
+	print(f"Samples: {sweep['n_samples']}  encode once: {sweep['encode_ms']:.1f} ms  components: {sweep['components_ms']:.1f} ms")
+	names = list(sweep["lams"][0]["accuracy"]) if sweep["lams"] else []
+	print(f"  {'lambda':>7} " + " ".join(f"{name:>7}" for name in names) + f" {'rank ms':>9}")
+	for row in sweep["lams"]:
+		accs = " ".join(f"{row['accuracy'][name]:>7.4f}" for name in names)
+		print(f"  {row['lam']:>7g} {accs} {row['rank_ms']:>9.3f}")
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+	print(f"Samples: {report['n_samples']}  lambda={report['lam']}")
+	for name, acc in report["accuracy"].items():
+		print(f"  {name:<6} accuracy: {acc:.4f}")
+	print(f"  {'stage':<8} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+	for stage, stats in report["latency_ms"].items():
+		print(f"  {stage:<8} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f}")
+	print(f"  throughput: {report['throughput_qps']:.1f} queries/s")
+	print(f"  peak RSS:   {report['peak_rss_mb']:.1f} MB")
+	if report.get("quantization"):
+		top = f"top{max(int(k[3:]) for k in report['accuracy'])}"
+		print(f"  {'precision':<9} {'MB':>9} {'B/API':>8} {'recall@' + top[3:]:>9} {'acc@' + top[3:]:>7} {'p50 ms':>8}")
+		for row in report["quantization"]:
+			print(
+				f"  {row['precision']:<9} {row['memory_mb']:>9.3f} {row['bytes_per_api']:>8.0f} "
+				f"{row['recall'][top]:>9.4f} {row['accuracy'][top]:>7.4f} {row['latency_ms']['p50']:>8.3f}"
+			)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+	parser = argparse.ArgumentParser(description="Benchmark tool selection on API-Bank style samples.")
+	parser.add_argument("samples", help="JSON / JSONL file of {query, gold_api} samples")
+	parser.add_argument("--output", "-o", default=None, help="write the full report as JSON")
+	parser.add_argument("--lam", type=float, default=1.0, help="lambda used to build z_T")
+	parser.add_argument("--top-k", type=int, nargs="+", default=list(DEFAULT_KS), help="accuracy cut-offs")
+	parser.add_argument("--warmup", type=int, default=3, help="untimed warm-up queries")
+	parser.add_argument("--limit", type=int, default=None, help="only use the first N samples")
+	parser.add_argument("--quantization", action="store_true", help="also report recall vs memory of quantized embedding storage")
+	parser.add_argument("--rerank", type=int, default=32, help="candidates re-ranked at full precision")
+	parser.add_argument("--lams", type=float, nargs="+", default=None, help="sweep these lambdas over fused z_T retrieval instead")
+	args = parser.parse_args(argv)
+
+	samples = load_samples(args.samples)
+	if args.limit is not None:
+		samples = samples[:args.limit]
+	if not samples:
+		print("No usable samples found.")
+		sys.exit(1)
+
+	ks = sorted(set(args.top_k))
+	if args.lams:
+		sweep = run_lambda_sweep(samples, lams=args.lams, ks=ks)
+		_print_sweep(sweep)
+		if args.output:
+			Path(args.output).write_text(json.dumps(sweep, ensure_ascii=False, indent=2), encoding="utf-8")
+			print(f"Report written to {args.output}")
+		return
+
+	report = run_benchmark(samples, lam=args.lam, ks=ks, warmup=args.warmup)
+	if args.quantization:
+		report["quantization"] = quantization_report(samples, lam=args.lam, ks=ks, rerank=args.rerank)
+	report["environment"] = {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform()}
+	_print_report(report)
+
+	if args.output:
+		Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+		print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
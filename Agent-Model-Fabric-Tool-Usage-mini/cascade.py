@@ -0,0 +1,244 @@
+"""Cascaded tool retrieval: cheap prefilter stages, then an expensive re-ranker.
+
+Usage:
+	python cascade.py "send an email to alice" [--stages capability:500 lexical:100] [--rerank fused]
+
+Prefilter stages run in order, and each keeps the best `budget` APIs of the
+previous stage's survivors (the first stage sees the whole catalog):
+
+- ``"capability"``: cosine of `a_T` against the `a_API` matrix.
+- ``"lexical"``: BM25 over the normalized API descriptions, read from an
+  inverted index so only postings of the query terms are touched.
+
+The re-ranker (``"capability"``, ``"semantic"`` on `z_sem` or ``"fused"`` on
+`z_T`) only scores the survivors, so its cost depends on the budgets rather
+than on the catalog size. Every stage reports how many APIs it scored and
+kept and how long it took.
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api_index import APIIndex, APIRow, load_api_index
+from semantic_index import api_vectors
+from text_handling import normalize_text, process_task
+from tool_usage import capability_engine
+from vector_ops import normalize_rows, top_k_rows
+
+PREFILTERS = ("capability", "lexical")
+RERANKERS = ("capability", "semantic", "fused")
+DEFAULT_STAGES: Tuple[Tuple[str, int], ...] = (("capability", 500), ("lexical", 100))
+
+
+class LexicalIndex:
+	"""BM25 inverted index: postings of term t are `docs[indptr[t]:indptr[t + 1]]`."""
+
+	def __init__(self, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> None:
+		self.vocab: Dict[str, int] = {}
+		doc_ids: List[int] = []
+		term_ids: List[int] = []
+		tfs: List[int] = []
+		lengths: List[int] = []
+		for d, text in enumerate(texts):
+			counts = Counter(normalize_text(text).split())
+			lengths.append(sum(counts.values()))
+			for token, tf in counts.items():
+				term_ids.append(self.vocab.setdefault(token, len(self.vocab)))
+				doc_ids.append(d)
+				tfs.append(tf)
+
+		self.n_docs = len(lengths)
+		terms = np.asarray(term_ids, dtype=np.int64)
+		docs = np.asarray(doc_ids, dtype=np.int64)
+		tf = np.asarray(tfs, dtype=float)
+		doc_len = np.asarray(lengths, dtype=float)
+		order = np.lexsort((docs, terms))
+		terms, docs, tf = terms[order], docs[order], tf[order]
+
+		self.indptr = np.searchsorted(terms, np.arange(len(self.vocab) + 1)).astype(np.int64)
+		self.docs = docs.astype(np.int32)
+		df = np.diff(self.indptr).astype(float)
+		idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+		avg_len = doc_len.mean() if self.n_docs and doc_len.mean() > 0 else 1.0
+		norm = k1 * (1 - b + b * doc_len[docs] / avg_len) if docs.size else np.zeros(0)
+		# Per-posting BM25 contribution, precomputed so a query only sums postings.
+		self.weights = (idf[terms] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+	def __len__(self) -> int:
+		return self.n_docs
+
+	def scores(self, tokens: Iterable[str]) -> np.ndarray:
+		"""BM25 score of every document for the query tokens."""
+		out = np.zeros(self.n_docs, dtype=float)
+		for token in set(tokens):
+			term = self.vocab.get(token)
+			if term is not None:
+				start, end = self.indptr[term], self.indptr[term + 1]
+				# A document appears at most once per posting list.
+				out[self.docs[start:end]] += self.weights[start:end]
+		return out
+
+
+_LEXICAL: Dict[str, LexicalIndex] = {}
+_LEXICAL_LOCK = threading.Lock()
+
+
+def lexical_index(index: Optional[APIIndex] = None) -> LexicalIndex:
+	"""BM25 index over the catalog descriptions (rebuilt when the index changes)."""
+	if index is None:
+		index = load_api_index()
+	with _LEXICAL_LOCK:
+		lex = _LEXICAL.get(index.fingerprint)
+		if lex is None:
+			_LEXICAL.clear()
+			lex = LexicalIndex(index.descriptions)
+			_LEXICAL[index.fingerprint] = lex
+		return lex
+
+
+@dataclass
+class StageStats:
+	name: str
+	scored: int
+	kept: int
+	ms: float
+
+
+@dataclass
+class CascadeResult:
+	apis: List[Tuple[APIRow, float]]
+	stages: List[StageStats] = field(default_factory=list)
+
+	@property
+	def total_ms(self) -> float:
+		return sum(stage.ms for stage in self.stages)
+
+
+class CascadeRetriever:
+	"""Prefilter stages with per-stage budgets, then a re-ranker over the survivors."""
+
+	def __init__(
+		self,
+		stages: Sequence[Tuple[str, int]] = DEFAULT_STAGES,
+		rerank: str = "fused",
+		lam: float = 1.0,
+		index: Optional[APIIndex] = None,
+	) -> None:
+		for name, budget in stages:
+			if name not in PREFILTERS:
+				raise ValueError(f"Unknown prefilter stage {name!r}; expected one of {PREFILTERS}")
+			if budget <= 0:
+				raise ValueError(f"Stage {name!r} needs a positive budget")
+		if rerank not in RERANKERS:
+			raise ValueError(f"Unknown re-ranker {rerank!r}; expected one of {RERANKERS}")
+
+		self.stages = tuple((name, int(budget)) for name, budget in stages)
+		self.rerank = rerank
+		self.lam = lam
+		self.index = index if index is not None else load_api_index(with_embeddings=rerank != "capability")
+		if rerank != "capability" and self.index.embeddings is None:
+			raise ValueError(f"Re-ranker {rerank!r} needs an index built with embeddings")
+
+		self._capability = capability_engine(self.index)
+		self._lexical = lexical_index(self.index) if any(name == "lexical" for name, _ in self.stages) else None
+		self._fused = api_vectors(self.index.embeddings, self.index.capabilities, lam, lazy=True) if rerank == "fused" else None
+
+	def _prefilter_scores(self, name: str, tokens: Sequence[str], a_t: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+		if name == "capability":
+			return self._capability.scores(a_t, rows)[0]
+		scores = self._lexical.scores(tokens)
+		return scores if rows is None else scores[rows]
+
+	def _rerank_scores(self, a_t: np.ndarray, z_sem: np.ndarray, z_t: np.ndarray, rows: np.ndarray) -> np.ndarray:
+		if self.rerank == "capability":
+			return self._capability.scores(a_t, rows)[0]
+		if self.rerank == "semantic":
+			matrix, query = self.index.embeddings[rows], z_sem
+		else:
+			matrix, query = self._fused[rows], z_t
+		q = normalize_rows(np.atleast_2d(np.asarray(query, dtype=float)))[0]
+		return normalize_rows(np.asarray(matrix, dtype=float)) @ q
+
+	def search_vectors(
+		self,
+		tokens: Sequence[str],
+		a_t: np.ndarray,
+		z_sem: np.ndarray,
+		z_t: np.ndarray,
+		top_k: int = 5,
+	) -> CascadeResult:
+		"""Run the cascade for one already-vectorized task."""
+		stats: List[StageStats] = []
+		rows: Optional[np.ndarray] = None
+		for name, budget in self.stages:
+			start = time.perf_counter()
+			scores = self._prefilter_scores(name, tokens, a_t, rows)
+			pos, _ = top_k_rows(scores[None, :], budget)
+			kept = pos[0] if rows is None else rows[pos[0]]
+			# Keep catalog order so later ties resolve by position, as in a full scan.
+			rows = np.sort(kept)
+			stats.append(StageStats(name, int(scores.shape[0]), int(rows.size), (time.perf_counter() - start) * 1000))
+
+		start = time.perf_counter()
+		if rows is None:
+			rows = np.arange(len(self.index))
+		scores = self._rerank_scores(a_t, z_sem, z_t, rows)
+		pos, best = top_k_rows(scores[None, :], top_k)
+		apis = [(self.index.row(rows[p]), float(s)) for p, s in zip(pos[0], best[0])]
+		stats.append(StageStats(f"rerank:{self.rerank}", int(rows.size), len(apis), (time.perf_counter() - start) * 1000))
+		return CascadeResult(apis=apis, stages=stats)
+
+	def search(self, task: str, top_k: int = 5) -> CascadeResult:
+		start = time.perf_counter()
+		vectors = process_task(task, self.lam)
+		encode = StageStats("encode", 1, 1, (time.perf_counter() - start) * 1000)
+		result = self.search_vectors(vectors.normalized_text.split(), vectors.a_t, vectors.z_sem, vectors.z_t, top_k)
+		result.stages.insert(0, encode)
+		return result
+
+
+def _parse_stage(spec: str) -> Tuple[str, int]:
+	name, _, budget = spec.partition(":")
+	return name, int(budget or 100)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Cascaded tool retrieval for one task.")
+	parser.add_argument("task", help="task description")
+	parser.add_argument("--stages", nargs="*", default=[f"{n}:{b}" for n, b in DEFAULT_STAGES], help="prefilter stages as name:budget")
+	parser.add_argument("--rerank", choices=RERANKERS, default="fused")
+	parser.add_argument("--lam", type=float, default=1.0, help="lambda used to build z_T")
+	parser.add_argument("--top-k", type=int, default=5)
+	args = parser.parse_args()
+
+	retriever = CascadeRetriever([_parse_stage(s) for s in args.stages], rerank=args.rerank, lam=args.lam)
+	result = retriever.search(args.task, args.top_k)
+	for rank, (api, score) in enumerate(result.apis, start=1):
+		print(f"{rank}. {api.name} (id={api.id}) | score={score:.4f}")
+	print(f"\n  {'stage':<20} {'scored':>8} {'kept':>8} {'ms':>9}")
+	for stage in result.stages:
+		print(f"  {stage.name:<20} {stage.scored:>8} {stage.kept:>8} {stage.ms:>9.3f}")
+
+
+__all__ = [
+	"CascadeResult",
+	"CascadeRetriever",
+	"DEFAULT_STAGES",
+	"LexicalIndex",
+	"PREFILTERS",
+	"RERANKERS",
+	"StageStats",
+	"lexical_index",
+]
+
+
+if __name__ == "__main__":
+	main()
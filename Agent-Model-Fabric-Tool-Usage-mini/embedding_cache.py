@@ -0,0 +1,322 @@
+"""Two-level cache for semantic embeddings.
+
+Entries are keyed by sha256(model identity, text), where the text is exactly
+what is handed to the encoder (callers pass normalized text).
+
+- Level 1: bounded in-process LRU.
+- Level 2: persistent content-addressed store in a directory per model:
+  ``vectors.bin`` holds fixed-size rows read through a memory map, and
+  ``keys.bin`` holds one 32-byte digest per row. Row i of ``vectors.bin``
+  always belongs to key i, and writers append under an exclusive file lock,
+  so several worker processes can share the same store.
+
+The disk level is opt-in per call (`disk=True`): index builds use it, query
+paths stay memory-only, since a single lookup or append costs more than
+re-encoding one short text. Writes are batched, one lock and one append per
+call, and a store stops growing once it reaches `max_bytes`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+try:
+	import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts fall back to in-process locking only
+	fcntl = None
+
+DEFAULT_EMBEDDING_CACHE_DIR = Path(__file__).resolve().parent / ".index_cache" / "embeddings"
+
+DEFAULT_DISK_MAX_BYTES = 256 << 20
+
+_KEY_BYTES = 32
+
+
+def cache_key(model: str, text: str) -> bytes:
+	return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+
+class LRUCache:
+	"""Thread-safe bounded mapping with hit/miss/eviction counters."""
+
+	def __init__(self, max_size: int = 4096) -> None:
+		self.max_size = max(0, max_size)
+		self._data: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def get(self, key: bytes) -> Optional[np.ndarray]:
+		with self._lock:
+			vec = self._data.get(key)
+			if vec is None:
+				self.misses += 1
+				return None
+			self._data.move_to_end(key)
+			self.hits += 1
+			return vec
+
+	def put(self, key: bytes, vec: np.ndarray) -> None:
+		if self.max_size == 0:
+			return
+		with self._lock:
+			self._data[key] = vec
+			self._data.move_to_end(key)
+			while len(self._data) > self.max_size:
+				self._data.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+
+
+class DiskEmbeddingStore:
+	"""Append-only, memory-mapped vector file plus a digest index (see module docstring)."""
+
+	def __init__(self, directory: Path, dtype: str = "<f8", max_bytes: int = DEFAULT_DISK_MAX_BYTES) -> None:
+		self.directory = Path(directory)
+		self.max_bytes = max(0, max_bytes)
+		self.directory.mkdir(parents=True, exist_ok=True)
+		self.dtype = np.dtype(dtype)
+		self._vec_path = self.directory / "vectors.bin"
+		self._key_path = self.directory / "keys.bin"
+		self._meta_path = self.directory / "meta.json"
+		self._lock_path = self.directory / ".lock"
+		self._lock = threading.Lock()
+
+		self.dim: Optional[int] = None
+		self._rows: Dict[bytes, int] = {}
+		self._n_rows = 0
+		self._mmap: Optional[np.memmap] = None
+		self.hits = 0
+		self.misses = 0
+		self.dropped = 0
+		self._load_meta()
+
+	def __len__(self) -> int:
+		return self._n_rows
+
+	def _load_meta(self) -> None:
+		if self.dim is None and self._meta_path.exists():
+			meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+			self.dim = int(meta["dim"])
+			self.dtype = np.dtype(meta["dtype"])
+
+	@contextmanager
+	def _file_lock(self) -> Iterator[None]:
+		with self._lock_path.open("a") as lock_file:
+			if fcntl is not None:
+				fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				if fcntl is not None:
+					fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+	def _refresh(self) -> None:
+		"""Pick up rows appended since the last look (possibly by other processes)."""
+		if not self._key_path.exists():
+			return
+		self._load_meta()
+		n_keys = self._key_path.stat().st_size // _KEY_BYTES
+		if n_keys <= self._n_rows:
+			return
+		with self._key_path.open("rb") as f:
+			f.seek(self._n_rows * _KEY_BYTES)
+			blob = f.read((n_keys - self._n_rows) * _KEY_BYTES)
+		for i in range(len(blob) // _KEY_BYTES):
+			self._rows.setdefault(blob[i * _KEY_BYTES:(i + 1) * _KEY_BYTES], self._n_rows + i)
+		self._n_rows = n_keys
+		self._mmap = None
+
+	def _vectors(self) -> np.memmap:
+		if self._mmap is None:
+			self._mmap = np.memmap(self._vec_path, dtype=self.dtype, mode="r", shape=(self._n_rows, self.dim))
+		return self._mmap
+
+	def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+		with self._lock:
+			if any(key not in self._rows for key in keys):
+				self._refresh()
+			rows = [self._rows.get(key) for key in keys]
+			found = [i for i, row in enumerate(rows) if row is not None]
+			self.hits += len(found)
+			self.misses += len(keys) - len(found)
+			out: List[Optional[np.ndarray]] = [None] * len(keys)
+			if found:
+				vecs = np.array(self._vectors()[[rows[i] for i in found]], dtype=float)
+				for i, vec in zip(found, vecs):
+					out[i] = vec
+			return out
+
+	def get(self, key: bytes) -> Optional[np.ndarray]:
+		return self.get_many([key])[0]
+
+	def put_many(self, keys: Sequence[bytes], vecs: np.ndarray) -> None:
+		"""Append every new row under one file lock; rows past `max_bytes` are dropped."""
+		vecs = np.asarray(vecs, dtype=self.dtype).reshape(len(keys), -1)
+		with self._lock, self._file_lock():
+			self._refresh()
+			if self.dim is None:
+				self.dim = int(vecs.shape[1])
+				self._meta_path.write_text(json.dumps({"dim": self.dim, "dtype": self.dtype.str}), encoding="utf-8")
+			if vecs.shape[1] != self.dim:
+				raise ValueError(f"Embedding dim {vecs.shape[1]} does not match store dim {self.dim}")
+
+			new: Dict[bytes, int] = {}
+			for i, key in enumerate(keys):
+				if key not in self._rows:
+					new.setdefault(key, i)
+			room = max(0, self.max_bytes // (self.dim * self.dtype.itemsize) - self._n_rows)
+			self.dropped += max(0, len(new) - room)
+			take = list(new.items())[:room]
+			if not take:
+				return
+
+			# Write the vectors at their row offset before publishing the keys, so a
+			# crash in between leaves at most an unreferenced tail.
+			row = self._n_rows
+			with self._vec_path.open("r+b" if self._vec_path.exists() else "wb") as f:
+				f.seek(row * self.dim * self.dtype.itemsize)
+				f.write(vecs[[i for _, i in take]].tobytes())
+			with self._key_path.open("ab") as f:
+				f.write(b"".join(key for key, _ in take))
+			for offset, (key, _) in enumerate(take):
+				self._rows[key] = row + offset
+			self._n_rows = row + len(take)
+			self._mmap = None
+
+	def put(self, key: bytes, vec: np.ndarray) -> None:
+		self.put_many([key], np.asarray(vec).reshape(1, -1))
+
+
+def _safe_dirname(model: str) -> str:
+	return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+class EmbeddingCache:
+	"""In-memory LRU in front of an optional per-model on-disk store (used only when `disk=True`)."""
+
+	def __init__(
+		self,
+		lru_size: int = 4096,
+		disk_dir: Optional[str] = None,
+		disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+	) -> None:
+		self.memory = LRUCache(lru_size)
+		self.disk_dir = Path(disk_dir) if disk_dir else None
+		self.disk_max_bytes = disk_max_bytes
+		self._stores: Dict[str, Optional[DiskEmbeddingStore]] = {}
+		self._lock = threading.Lock()
+
+	def _store(self, model: str) -> Optional[DiskEmbeddingStore]:
+		if self.disk_dir is None:
+			return None
+		with self._lock:
+			if model not in self._stores:
+				try:
+					self._stores[model] = DiskEmbeddingStore(
+						self.disk_dir / _safe_dirname(model), max_bytes=self.disk_max_bytes
+					)
+				except OSError:
+					# Read-only checkouts keep working with the memory level only.
+					self._stores[model] = None
+			return self._stores[model]
+
+	def get_many(self, model: str, texts: Sequence[str], disk: bool = False) -> List[Optional[np.ndarray]]:
+		keys = [cache_key(model, text) for text in texts]
+		out: List[Optional[np.ndarray]] = []
+		for key in keys:
+			vec = self.memory.get(key)
+			out.append(vec.copy() if vec is not None else None)
+		missing = [i for i, vec in enumerate(out) if vec is None]
+		store = self._store(model) if disk and missing else None
+		if store is None:
+			return out
+		for i, vec in zip(missing, store.get_many([keys[i] for i in missing])):
+			if vec is not None:
+				self.memory.put(keys[i], vec.copy())
+				out[i] = vec
+		return out
+
+	def get(self, model: str, text: str, disk: bool = False) -> Optional[np.ndarray]:
+		return self.get_many(model, [text], disk=disk)[0]
+
+	def put_many(self, model: str, texts: Sequence[str], vecs: np.ndarray, disk: bool = False) -> None:
+		keys = [cache_key(model, text) for text in texts]
+		for key, vec in zip(keys, vecs):
+			self.memory.put(key, np.array(vec, dtype=float))
+		store = self._store(model) if disk and keys else None
+		if store is not None:
+			try:
+				store.put_many(keys, vecs)
+			except OSError:
+				pass
+
+	def put(self, model: str, text: str, vec: np.ndarray, disk: bool = False) -> None:
+		self.put_many(model, [text], np.asarray(vec).reshape(1, -1), disk=disk)
+
+	def stats(self) -> Dict[str, int]:
+		"""Hit/miss counters; a disk lookup only happens after a memory miss."""
+		disk_hits = sum(s.hits for s in self._stores.values() if s is not None)
+		disk_misses = sum(s.misses for s in self._stores.values() if s is not None)
+		return {
+			"memory_hits": self.memory.hits,
+			"memory_misses": self.memory.misses,
+			"memory_size": len(self.memory),
+			"memory_evictions": self.memory.evictions,
+			"disk_hits": disk_hits,
+			"disk_misses": disk_misses,
+			"disk_size": sum(len(s) for s in self._stores.values() if s is not None),
+			"disk_dropped": sum(s.dropped for s in self._stores.values() if s is not None),
+		}
+
+	def clear_memory(self) -> None:
+		self.memory.clear()
+
+
+_DEFAULT_CACHE: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+	global _DEFAULT_CACHE
+	if _DEFAULT_CACHE is None:
+		_DEFAULT_CACHE = EmbeddingCache(disk_dir=str(DEFAULT_EMBEDDING_CACHE_DIR))
+	return _DEFAULT_CACHE
+
+
+def configure_embedding_cache(
+	lru_size: int = 4096,
+	disk_dir: Optional[str] = None,
+	disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+) -> EmbeddingCache:
+	"""Replace the process-wide cache (`disk_dir=None` keeps it memory-only)."""
+	global _DEFAULT_CACHE
+	_DEFAULT_CACHE = EmbeddingCache(lru_size=lru_size, disk_dir=disk_dir, disk_max_bytes=disk_max_bytes)
+	return _DEFAULT_CACHE
+
+
+__all__ = [
+	"DEFAULT_DISK_MAX_BYTES",
+	"DEFAULT_EMBEDDING_CACHE_DIR",
+	"DiskEmbeddingStore",
+	"EmbeddingCache",
+	"LRUCache",
+	"cache_key",
+	"configure_embedding_cache",
+	"get_embedding_cache",
+]
@@ -0,0 +1,167 @@
+"""Feature-hashing text vectorizer (fallback `z_sem` when SBERT is unavailable).
+
+Tokens (and optional word n-grams) are hashed with CRC32, which is fast, non
+cryptographic and stable across processes. Each distinct term's
+`(bucket, sign)` pair is memoized (up to `memo_size` terms), so repeated
+vocabulary costs one dict lookup. With `signed=True` the hash also picks a +/-1 sign, so collisions
+tend to cancel instead of piling up.
+
+`transform` vectorizes many documents at once into a CSR-style `SparseRows`;
+`transform_dense` returns the equivalent `(n_docs, n_features)` matrix.
+"""
+
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+Document = Union[str, Sequence[str]]
+
+
+@dataclass
+class SparseRows:
+	"""CSR matrix: row i has `data[indptr[i]:indptr[i + 1]]` at columns `indices[...]`."""
+
+	indptr: np.ndarray
+	indices: np.ndarray
+	data: np.ndarray
+	n_features: int
+
+	def __len__(self) -> int:
+		return int(self.indptr.shape[0] - 1)
+
+	@property
+	def shape(self) -> Tuple[int, int]:
+		return len(self), self.n_features
+
+	def row(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+		start, end = self.indptr[i], self.indptr[i + 1]
+		return self.indices[start:end], self.data[start:end]
+
+	def toarray(self) -> np.ndarray:
+		out = np.zeros(self.shape, dtype=self.data.dtype)
+		rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+		out[rows, self.indices] = self.data
+		return out
+
+	def to_scipy(self):
+		"""Convert to `scipy.sparse.csr_matrix` (requires scipy)."""
+		from scipy.sparse import csr_matrix
+
+		return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+class HashingVectorizer:
+	def __init__(
+		self,
+		n_features: int = 1024,
+		signed: bool = True,
+		ngram_range: Tuple[int, int] = (1, 2),
+		normalize: bool = True,
+		seed: int = 0,
+		memo_size: int = 1 << 20,
+	) -> None:
+		if n_features <= 0:
+			raise ValueError("n_features must be positive")
+		if not 1 <= ngram_range[0] <= ngram_range[1]:
+			raise ValueError(f"Invalid ngram_range {ngram_range}")
+		self.n_features = n_features
+		self.signed = signed
+		self.ngram_range = ngram_range
+		self.normalize = normalize
+		self.seed = seed
+		self.memo_size = memo_size
+		self._memo: Dict[str, Tuple[int, float]] = {}
+
+	@property
+	def identity(self) -> str:
+		"""Stable description of the configuration (vectors differ whenever it does)."""
+		lo, hi = self.ngram_range
+		return f"hash-crc32-{self.n_features}{'-signed' if self.signed else ''}-ng{lo}{hi}-s{self.seed}"
+
+	def _bucket(self, term: str) -> Tuple[int, float]:
+		hit = self._memo.get(term)
+		if hit is None:
+			h = zlib.crc32(term.encode("utf-8"), self.seed)
+			# Low bits pick the bucket, the top bit picks the sign.
+			sign = -1.0 if (self.signed and h & 0x80000000) else 1.0
+			hit = (h % self.n_features, sign)
+			if len(self._memo) < self.memo_size:
+				self._memo[term] = hit
+		return hit
+
+	def _terms(self, doc: Document) -> List[str]:
+		tokens = doc.split() if isinstance(doc, str) else list(doc)
+		lo, hi = self.ngram_range
+		if lo == hi == 1:
+			return tokens
+		terms: List[str] = []
+		for n in range(lo, hi + 1):
+			if n == 1:
+				terms.extend(tokens)
+			else:
+				terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+		return terms
+
+	def _hashed(self, docs: Sequence[Document]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+		"""Flat `(row, column, sign)` arrays for every term of every document."""
+		bucket = self._bucket
+		lengths = np.zeros(len(docs), dtype=np.intp)
+		cols: List[int] = []
+		signs: List[float] = []
+		for i, doc in enumerate(docs):
+			terms = self._terms(doc)
+			lengths[i] = len(terms)
+			for term in terms:
+				col, sign = bucket(term)
+				cols.append(col)
+				signs.append(sign)
+		rows = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+		return rows, np.asarray(cols, dtype=np.int64), np.asarray(signs, dtype=float)
+
+	def transform(self, docs: Sequence[Document]) -> SparseRows:
+		"""Vectorize many documents (strings are split on whitespace) into CSR rows."""
+		n_docs = len(docs)
+		rows, cols, signs = self._hashed(docs)
+		uniq, inverse = np.unique(rows * self.n_features + cols, return_inverse=True)
+		data = np.bincount(inverse, weights=signs, minlength=uniq.size)
+
+		# Signed collisions can cancel to exactly zero; drop those entries.
+		keep = data != 0
+		uniq, data = uniq[keep], data[keep]
+		row_of = uniq // self.n_features
+		indices = (uniq % self.n_features).astype(np.int32)
+		indptr = np.searchsorted(row_of, np.arange(n_docs + 1)).astype(np.int64)
+
+		if self.normalize and data.size:
+			norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=n_docs))
+			data = data / norms[row_of]
+		return SparseRows(indptr=indptr, indices=indices, data=data, n_features=self.n_features)
+
+	def _finish_dense(self, out: np.ndarray) -> np.ndarray:
+		if self.normalize:
+			norms = np.linalg.norm(out, axis=-1, keepdims=True)
+			out = np.divide(out, norms, out=out, where=norms > 0)
+		return out
+
+	def transform_dense(self, docs: Sequence[Document]) -> np.ndarray:
+		"""Same values as `transform(docs).toarray()`, accumulated straight into a dense matrix."""
+		n_docs = len(docs)
+		rows, cols, signs = self._hashed(docs)
+		flat = np.bincount(rows * self.n_features + cols, weights=signs, minlength=n_docs * self.n_features)
+		return self._finish_dense(flat.reshape(n_docs, self.n_features))
+
+	def transform_one(self, doc: Document) -> np.ndarray:
+		bucket = self._bucket
+		pairs = [bucket(term) for term in self._terms(doc)]
+		if not pairs:
+			return np.zeros(self.n_features, dtype=float)
+		cols, signs = zip(*pairs)
+		vec = np.bincount(cols, weights=signs, minlength=self.n_features)
+		return self._finish_dense(vec)
+
+
+__all__ = ["HashingVectorizer", "SparseRows"]
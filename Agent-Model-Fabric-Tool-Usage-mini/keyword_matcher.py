@@ -0,0 +1,126 @@
+"""Compiled keyword matcher for the `a_T` / `a_API` capability counts.
+
+`KEYWORDS` is compiled once into a token -> capability-bitmask hash index, so a
+single pass over the tokens yields the hit counts of every capability.
+Vocabulary entries that normalize to several tokens (e.g. "e-mail" ->
+"e mail") are matched as phrases by walking a token trie.
+
+Counting rule: every (position, vocabulary-entry length) match adds 1 to each
+capability whose list contains that entry, so duplicated entries inside one
+capability list are counted once, exactly like the `t in vocab` test.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class KeywordMatcher:
+	"""Token/phrase -> capability bitmask index built from a keyword table."""
+
+	def __init__(
+		self,
+		keywords: Mapping[str, Iterable[str]],
+		order: Sequence[str],
+		normalize: Callable[[str], str] = str.lower,
+	) -> None:
+		if len(order) > 63:
+			raise ValueError("KeywordMatcher supports at most 63 capabilities")
+		self.order: Tuple[str, ...] = tuple(order)
+		self.token_masks: Dict[str, int] = {}
+		# Phrase trie: token -> (mask of phrases ending here, children)
+		self._phrases: Dict[str, Tuple[int, dict]] = {}
+		self._max_phrase = 1
+
+		for bit, key in enumerate(self.order):
+			for entry in keywords.get(key, []):
+				tokens = normalize(entry).split()
+				if not tokens:
+					continue
+				if len(tokens) == 1:
+					self.token_masks[tokens[0]] = self.token_masks.get(tokens[0], 0) | (1 << bit)
+				else:
+					self._add_phrase(tokens, 1 << bit)
+
+	def _add_phrase(self, tokens: List[str], mask: int) -> None:
+		self._max_phrase = max(self._max_phrase, len(tokens))
+		level = self._phrases
+		for i, tok in enumerate(tokens):
+			node_mask, children = level.get(tok, (0, {}))
+			if i == len(tokens) - 1:
+				node_mask |= mask
+			level[tok] = (node_mask, children)
+			level = children
+
+	@property
+	def has_phrases(self) -> bool:
+		return bool(self._phrases)
+
+	def _phrase_masks(self, tokens: Sequence[str]) -> List[int]:
+		"""Masks of every phrase match in `tokens` (one entry per matched span)."""
+		found: List[int] = []
+		for start in range(len(tokens)):
+			level = self._phrases
+			for tok in tokens[start:start + self._max_phrase]:
+				node = level.get(tok)
+				if node is None:
+					break
+				if node[0]:
+					found.append(node[0])
+				level = node[1]
+		return found
+
+	def _masks_to_counts(self, masks: Iterable[int]) -> np.ndarray:
+		counts = np.zeros(len(self.order), dtype=float)
+		for mask in masks:
+			bit = 0
+			while mask:
+				if mask & 1:
+					counts[bit] += 1
+				mask >>= 1
+				bit += 1
+		return counts
+
+	def count(self, tokens: Iterable[str]) -> np.ndarray:
+		"""Per-capability hit counts for one token sequence."""
+		tokens = list(tokens)
+		get = self.token_masks.get
+		masks = [m for m in (get(t, 0) for t in tokens) if m]
+		if self._phrases:
+			masks.extend(self._phrase_masks(tokens))
+		return self._masks_to_counts(masks)
+
+	def count_many(self, token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+		"""`(n_docs, n_capabilities)` hit counts for many token sequences at once."""
+		n_docs = len(token_lists)
+		n_caps = len(self.order)
+		counts = np.zeros((n_docs, n_caps), dtype=float)
+		if n_docs == 0:
+			return counts
+
+		get = self.token_masks.get
+		lengths = np.fromiter((len(toks) for toks in token_lists), dtype=np.intp, count=n_docs)
+		masks = np.fromiter(
+			(get(t, 0) for toks in token_lists for t in toks),
+			dtype=np.int64,
+			count=int(lengths.sum()),
+		)
+		if masks.size:
+			doc_idx = np.repeat(np.arange(n_docs), lengths)
+			hit = masks != 0
+			doc_idx, masks = doc_idx[hit], masks[hit]
+			for bit in range(n_caps):
+				weights = (masks >> bit) & 1
+				counts[:, bit] = np.bincount(doc_idx, weights=weights, minlength=n_docs)
+
+		if self._phrases:
+			for i, toks in enumerate(token_lists):
+				phrase_masks = self._phrase_masks(toks)
+				if phrase_masks:
+					counts[i] += self._masks_to_counts(phrase_masks)
+		return counts
+
+
+__all__ = ["KeywordMatcher"]
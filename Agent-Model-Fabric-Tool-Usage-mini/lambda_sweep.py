@@ -0,0 +1,78 @@
+"""Fused `z_T` scores for many λ values from one set of similarity components.
+
+For `z_T = concat(z_sem, λ·a_T)` and `z_API = concat(z_api, λ·a_API)`:
+
+	z_T · z_API = z_sem · z_api + λ² (a_T · a_API)
+	|z_T|²      = |z_sem|² + λ² |a_T|²
+
+so the cosine for any λ follows from the two dot-product matrices and the
+four squared-norm vectors, which are computed once. Each extra λ costs one
+elementwise pass over the `(n_tasks, n_apis)` matrices instead of another
+round of normalization, keyword counting and embedding.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from vector_ops import top_k_rows
+
+# λ grid from the readme.
+DEFAULT_LAMS: Tuple[float, ...] = (0.1, 0.5, 1.0, 2.0, 5.0)
+
+
+@dataclass
+class FusionComponents:
+	"""Per-(task, API) similarity components shared by every λ."""
+
+	sem_dot: np.ndarray
+	cap_dot: np.ndarray
+	task_sem_sq: np.ndarray
+	task_cap_sq: np.ndarray
+	api_sem_sq: np.ndarray
+	api_cap_sq: np.ndarray
+
+	@classmethod
+	def from_vectors(
+		cls,
+		z_sem: np.ndarray,
+		a_t: np.ndarray,
+		api_embeddings: np.ndarray,
+		api_capabilities: np.ndarray,
+	) -> "FusionComponents":
+		z_sem = np.atleast_2d(np.asarray(z_sem, dtype=float))
+		a_t = np.atleast_2d(np.asarray(a_t, dtype=float))
+		emb = np.asarray(api_embeddings, dtype=float)
+		cap = np.asarray(api_capabilities, dtype=float)
+		return cls(
+			sem_dot=z_sem @ emb.T,
+			cap_dot=a_t @ cap.T,
+			task_sem_sq=np.einsum("ij,ij->i", z_sem, z_sem),
+			task_cap_sq=np.einsum("ij,ij->i", a_t, a_t),
+			api_sem_sq=np.einsum("ij,ij->i", emb, emb),
+			api_cap_sq=np.einsum("ij,ij->i", cap, cap),
+		)
+
+	@property
+	def shape(self) -> Tuple[int, int]:
+		return self.sem_dot.shape
+
+	def scores(self, lam: float) -> np.ndarray:
+		"""Cosine between fused task and API vectors for this λ, `(n_tasks, n_apis)`."""
+		lam2 = lam * lam
+		dots = self.sem_dot + lam2 * self.cap_dot
+		task_norm = np.sqrt(self.task_sem_sq + lam2 * self.task_cap_sq)
+		api_norm = np.sqrt(self.api_sem_sq + lam2 * self.api_cap_sq)
+		denom = np.outer(task_norm, api_norm)
+		# Zero vectors score 0, as with `normalize_rows`.
+		return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+	def top_k(self, lam: float, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+		"""Row positions and fused scores of the best `top_k` APIs per task."""
+		return top_k_rows(self.scores(lam), top_k)
+
+
+__all__ = ["DEFAULT_LAMS", "FusionComponents"]
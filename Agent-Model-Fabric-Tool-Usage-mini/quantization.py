@@ -0,0 +1,75 @@
+"""Compressed storage for row-normalized API vectors.
+
+- ``"float16"``: half-precision copy of each unit-norm row (2 bytes/dim).
+- ``"int8"``: each unit-norm row is scaled by its own `max|x| / 127` and
+  rounded, so row i is approximately `scales[i] * codes[i]` (1 byte/dim plus
+  one float32 per row).
+
+Scores computed from the codes are approximate; `SemanticIndex` uses them to
+shortlist candidates and re-ranks the shortlist at full precision.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import numpy as np
+
+from vector_ops import normalize_rows
+
+PRECISIONS = ("full", "float16", "int8")
+
+
+class QuantizedRows:
+	"""Unit-norm vectors stored as float16 or per-row-scaled int8 codes."""
+
+	def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray] = None) -> None:
+		self.codes = codes
+		self.scales = scales
+
+	@classmethod
+	def encode(cls, vectors: Any, precision: str, block_size: int = 4096) -> "QuantizedRows":
+		"""Normalize and quantize `vectors` block by block (any row-sliceable array)."""
+		if precision not in ("float16", "int8"):
+			raise ValueError(f"Unknown precision {precision!r}; expected 'float16' or 'int8'")
+		n, dim = vectors.shape
+		codes = np.empty((n, dim), dtype=np.float16 if precision == "float16" else np.int8)
+		scales = np.empty(n, dtype=np.float32) if precision == "int8" else None
+		for start in range(0, n, max(1, block_size)):
+			block = normalize_rows(np.asarray(vectors[start:start + block_size], dtype=np.float32))
+			end = start + block.shape[0]
+			if scales is None:
+				codes[start:end] = block
+				continue
+			peak = np.abs(block).max(axis=1) if dim else np.zeros(block.shape[0], dtype=np.float32)
+			scale = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+			codes[start:end] = np.rint(block / scale[:, None])
+			scales[start:end] = scale
+		return cls(codes, scales)
+
+	def __len__(self) -> int:
+		return int(self.codes.shape[0])
+
+	@property
+	def precision(self) -> str:
+		return "int8" if self.scales is not None else "float16"
+
+	@property
+	def nbytes(self) -> int:
+		return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+	def decode(self, rows: Any = slice(None)) -> np.ndarray:
+		out = self.codes[rows].astype(np.float32)
+		if self.scales is not None:
+			out *= self.scales[rows][:, None]
+		return out
+
+	def dot(self, queries: np.ndarray, rows: Any = slice(None)) -> np.ndarray:
+		"""Approximate `(n_queries, n_rows)` inner products with the selected rows."""
+		scores = np.asarray(queries, dtype=np.float32) @ self.codes[rows].astype(np.float32).T
+		if self.scales is not None:
+			scores *= self.scales[rows]
+		return scores
+
+
+__all__ = ["PRECISIONS", "QuantizedRows"]
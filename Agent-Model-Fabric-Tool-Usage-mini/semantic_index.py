@@ -0,0 +1,278 @@
+"""Nearest-neighbour index over API embeddings (`z_sem` or fused `z_T` retrieval).
+
+Two search modes over L2-normalized vectors (inner product == cosine):
+
+- ``"exact"``: blocked brute force; the API matrix is scanned `block_size`
+  rows at a time and per-block top-k lists are merged, so memory stays
+  bounded for very large catalogs.
+- ``"ivf"``: inverted-file index. A spherical k-means coarse quantizer splits
+  the APIs into `n_lists` cells and a query only scans its `n_probe` closest
+  cells. Raising `n_probe` trades latency for recall (`n_probe == n_lists`
+  is exact).
+
+With `precision="float16"` or `"int8"` the compressed rows (see
+`quantization.QuantizedRows`) are scanned. Either mode shortlists the best
+`rerank` candidates from the compressed rows, then re-scores that shortlist
+exactly against a normalized float32 copy of `vectors` built once at
+construction. With `rerank_path` that copy is a memory-mapped `.npy` file,
+so only the compressed rows stay resident.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from quantization import PRECISIONS, QuantizedRows
+from vector_ops import merge_top_k, normalize_rows, top_k_rows
+
+SEARCH_MODES = ("exact", "ivf")
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, n_iter: int, seed: int) -> np.ndarray:
+	"""Spherical k-means; returns unit-norm centroids `(n_lists, dim)`."""
+	rng = np.random.default_rng(seed)
+	centroids = vectors[rng.choice(vectors.shape[0], size=n_lists, replace=False)].copy()
+	for _ in range(n_iter):
+		assign = np.argmax(vectors @ centroids.T, axis=1)
+		sums = np.zeros_like(centroids)
+		np.add.at(sums, assign, vectors)
+		counts = np.bincount(assign, minlength=n_lists)
+		empty = np.flatnonzero(counts == 0)
+		if empty.size:
+			# Re-seed empty cells with random points so every list stays usable.
+			sums[empty] = vectors[rng.choice(vectors.shape[0], size=empty.size, replace=False)]
+		centroids = normalize_rows(sums)
+	return centroids
+
+
+def _rerank_rows(vectors: Any, block_size: int, path: Optional[Path]) -> np.ndarray:
+	"""Normalized float32 rows of `vectors`, in memory or memory-mapped from `path` (reused when the shape matches)."""
+	n, dim = int(vectors.shape[0]), int(vectors.shape[1])
+	if path is not None:
+		try:
+			rows = np.load(path, mmap_mode="r", allow_pickle=False)
+			if rows.shape == (n, dim) and rows.dtype == np.float32:
+				return rows
+		except (OSError, ValueError):
+			pass
+		path.parent.mkdir(parents=True, exist_ok=True)
+		tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+		out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n, dim))
+	else:
+		out = np.empty((n, dim), dtype=np.float32)
+	for start in range(0, n, block_size):
+		out[start:start + block_size] = normalize_rows(np.asarray(vectors[start:start + block_size], dtype=np.float32))
+	if path is None:
+		return out
+	out.flush()
+	del out
+	os.replace(tmp, path)
+	return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+class SemanticIndex:
+	"""Top-k inner-product search over a fixed matrix of API vectors."""
+
+	def __init__(
+		self,
+		vectors: np.ndarray,
+		ids: Optional[np.ndarray] = None,
+		mode: str = "exact",
+		block_size: int = 4096,
+		n_lists: Optional[int] = None,
+		n_probe: int = 8,
+		n_iter: int = 10,
+		seed: int = 0,
+		precision: str = "full",
+		rerank: int = 32,
+		rerank_path: Optional[str] = None,
+	) -> None:
+		if mode not in SEARCH_MODES:
+			raise ValueError(f"Unknown search mode {mode!r}; expected one of {SEARCH_MODES}")
+		if precision not in PRECISIONS:
+			raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+
+		self.precision = precision
+		self.rerank = max(1, rerank)
+		self.block_size = max(1, block_size)
+		self.codes: Optional[QuantizedRows] = None
+		self._exact: Optional[np.ndarray] = None
+		if precision == "full":
+			# float32, the same baseline the quantized precisions are measured against.
+			self.vectors = normalize_rows(np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32))
+		else:
+			self.codes = QuantizedRows.encode(vectors, precision, self.block_size)
+			# Built once so re-ranking is a gather from a contiguous matrix, not a per-query fuse.
+			self._exact = _rerank_rows(vectors, self.block_size, Path(rerank_path) if rerank_path else None)
+			self.vectors = None
+		self._shape = (int(vectors.shape[0]), int(vectors.shape[1]))
+		# Anything indexable by an integer array (ndarray, `TextColumn`).
+		self.ids = ids if ids is not None else np.arange(self._shape[0])
+		self.mode = mode
+		self.n_probe = max(1, n_probe)
+
+		self.centroids: Optional[np.ndarray] = None
+		self._list_offsets: Optional[np.ndarray] = None
+		self._list_rows: Optional[np.ndarray] = None
+		if mode == "ivf" and len(self) > 0:
+			n_lists = n_lists or max(1, int(math.sqrt(len(self))))
+			self._build_ivf(min(n_lists, len(self)), n_iter, seed)
+
+	def __len__(self) -> int:
+		return self._shape[0]
+
+	@property
+	def dim(self) -> int:
+		return self._shape[1]
+
+	@property
+	def nbytes(self) -> int:
+		"""Bytes of the arrays the index holds in memory.
+
+		Searchable rows, IVF centroids and lists, and the re-ranking rows unless
+		they are memory-mapped.
+		"""
+		held = [self.vectors, self.centroids, self._list_rows, self._list_offsets]
+		if self._exact is not None and not isinstance(self._exact, np.memmap):
+			held.append(self._exact)
+		total = sum(arr.nbytes for arr in held if arr is not None)
+		return int(total + (self.codes.nbytes if self.codes is not None else 0))
+
+	def _dot(self, queries: np.ndarray, rows: Any) -> np.ndarray:
+		if self.codes is None:
+			return queries.astype(np.float32, copy=False) @ self.vectors[rows].T
+		return self.codes.dot(queries, rows)
+
+	def _build_ivf(self, n_lists: int, n_iter: int, seed: int) -> None:
+		data = self.vectors if self.codes is None else self.codes.decode()
+		self.centroids = _kmeans(data, n_lists, n_iter, seed)
+		assign = np.argmax(data @ self.centroids.T, axis=1)
+		# CSR layout: rows of list c are _list_rows[_list_offsets[c]:_list_offsets[c + 1]].
+		self._list_rows = np.argsort(assign, kind="stable")
+		self._list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+
+	def _search_exact(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+		n_q = queries.shape[0]
+		best_idx = np.zeros((n_q, 0), dtype=np.intp)
+		best_scores = np.zeros((n_q, 0), dtype=float)
+		for start in range(0, len(self), self.block_size):
+			idx, scores = top_k_rows(self._dot(queries, slice(start, start + self.block_size)), top_k)
+			best_idx, best_scores = merge_top_k(best_idx, best_scores, idx + start, scores, top_k)
+		return best_idx, best_scores
+
+	def _rerank(self, queries: np.ndarray, candidates: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+		"""Exact scores for the shortlisted rows (-1 = padding); returns the best `top_k`."""
+		k = min(top_k, candidates.shape[1])
+		# Ascending row order (padding last) so ties resolve by row like the full-precision scan.
+		cand = np.sort(np.where(candidates >= 0, candidates, len(self)), axis=1)
+		valid = cand < len(self)
+		gathered = self._exact[np.where(valid, cand, 0)]
+		exact = np.einsum("qd,qcd->qc", queries.astype(np.float32, copy=False), gathered)
+		exact = np.where(valid, exact, -np.inf)
+		pos, scores = top_k_rows(exact, k)
+		idx = np.take_along_axis(cand, pos, axis=1)
+		idx[np.isneginf(scores)] = -1
+		return idx, scores.astype(float)
+
+	def _search_ivf(self, queries: np.ndarray, top_k: int, n_probe: int) -> Tuple[np.ndarray, np.ndarray]:
+		n_lists = self.centroids.shape[0]
+		n_probe = min(n_probe, n_lists)
+		probes, _ = top_k_rows(queries @ self.centroids.T, n_probe)
+
+		k = min(top_k, len(self))
+		out_idx = np.full((queries.shape[0], k), -1, dtype=np.intp)
+		out_scores = np.full((queries.shape[0], k), -np.inf)
+		for q, cells in enumerate(probes):
+			rows = np.concatenate([
+				self._list_rows[self._list_offsets[c]:self._list_offsets[c + 1]] for c in cells
+			])
+			if rows.size == 0:
+				continue
+			rows.sort()
+			pos, scores = top_k_rows(self._dot(queries[q:q + 1], rows), k)
+			n = pos.shape[1]
+			out_idx[q, :n] = rows[pos[0]]
+			out_scores[q, :n] = scores[0]
+		return out_idx, out_scores
+
+	def top_k(
+		self,
+		queries: np.ndarray,
+		top_k: int = 5,
+		n_probe: Optional[int] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""Row positions and scores per query.
+
+		In IVF mode a query whose probed cells hold fewer than `top_k` APIs is
+		padded with position -1 and score -inf.
+		"""
+		q = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=float)))
+		if q.shape[1] != self.dim:
+			raise ValueError(f"Query dim {q.shape[1]} does not match index dim {self.dim}")
+		shortlist = top_k if self.codes is None else max(top_k, self.rerank)
+		if self.mode == "ivf" and self.centroids is not None:
+			idx, scores = self._search_ivf(q, shortlist, n_probe or self.n_probe)
+		else:
+			idx, scores = self._search_exact(q, shortlist)
+		if self.codes is None:
+			return idx, scores
+		return self._rerank(q, idx, top_k)
+
+	def search(
+		self,
+		queries: np.ndarray,
+		top_k: int = 5,
+		n_probe: Optional[int] = None,
+	) -> Tuple[np.ndarray, np.ndarray]:
+		"""API ids and scores, each shaped `(n_queries, top_k)`."""
+		idx, scores = self.top_k(queries, top_k, n_probe)
+		ids = self.ids[np.clip(idx, 0, None)] if len(self) else np.empty(idx.shape, dtype=object)
+		return ids, scores
+
+
+class FusedRows:
+	"""Read-only view of `concat(embeddings, lam * capabilities)`; rows are fused when indexed."""
+
+	def __init__(self, embeddings: np.ndarray, capabilities: np.ndarray, lam: float) -> None:
+		self.embeddings = embeddings
+		self.capabilities = capabilities
+		self.lam = lam
+
+	@property
+	def shape(self) -> Tuple[int, int]:
+		return int(self.embeddings.shape[0]), int(self.embeddings.shape[1] + self.capabilities.shape[1])
+
+	def __len__(self) -> int:
+		return self.shape[0]
+
+	def __getitem__(self, rows: Any) -> np.ndarray:
+		emb = np.asarray(self.embeddings[rows], dtype=float)
+		cap = np.asarray(self.capabilities[rows], dtype=float)
+		return np.hstack([emb, self.lam * cap])
+
+
+def api_vectors(
+	embeddings: np.ndarray,
+	capabilities: np.ndarray,
+	lam: Optional[float] = None,
+	lazy: bool = False,
+) -> np.ndarray | FusedRows:
+	"""API-side vectors matching a query space: `z_sem` when `lam` is None, else fused like `z_T`.
+
+	With `lazy=True` the fused matrix is returned as a `FusedRows` view instead
+	of being materialized.
+	"""
+	if lam is None:
+		return embeddings
+	if lazy:
+		return FusedRows(embeddings, capabilities, lam)
+	# Row-wise `fuse_vectors`.
+	return np.hstack([embeddings, lam * capabilities])
+
+
+__all__ = ["SEARCH_MODES", "FusedRows", "SemanticIndex", "api_vectors"]
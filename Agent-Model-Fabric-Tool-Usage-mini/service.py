@@ -0,0 +1,284 @@
+"""Long-lived tool-selection service with request micro-batching.
+
+Usage:
+	python service.py [--host 127.0.0.1 --port 8765 | --unix /tmp/tool_select.sock]
+
+Endpoints (HTTP/1.1, JSON):
+	POST /select   {"task": "...", "top_k": 5}  or  {"tasks": ["...", ...], "top_k": 5}
+	GET  /health
+
+The encoder and API index are loaded once at start-up. Concurrent requests are
+queued and coalesced into micro-batches: the batcher waits at most
+`window_ms` after the first queued task, or until `max_batch` tasks are
+queued, then builds the batch's keyword vectors with `compute_keyword_matrix`
+and scores them with one matrix multiply. When `max_queue` tasks are already waiting, new
+requests are rejected with 503 instead of queueing without bound.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from api_index import load_api_index
+from text_handling import compute_keyword_matrix, normalize_text
+from tool_usage import capability_engine
+
+MAX_BODY_BYTES = 1 << 20
+
+
+@dataclass
+class _Pending:
+	text: str
+	top_k: int
+	future: asyncio.Future
+	enqueued: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+	"""Coalesces single-task requests into batched keyword-vector + scoring calls."""
+
+	def __init__(self, max_batch: int = 64, window_ms: float = 5.0, max_queue: int = 1024) -> None:
+		self.max_batch = max(1, max_batch)
+		self.window = max(0.0, window_ms) / 1000
+		self.queue: "asyncio.Queue[_Pending]" = asyncio.Queue(maxsize=max(1, max_queue))
+		self.batches = 0
+		self.tasks = 0
+		self._worker: Optional[asyncio.Task] = None
+
+	def start(self) -> None:
+		self._worker = asyncio.get_running_loop().create_task(self._run())
+
+	async def stop(self) -> None:
+		if self._worker is not None:
+			self._worker.cancel()
+			try:
+				await self._worker
+			except asyncio.CancelledError:
+				pass
+
+	def submit(self, text: str, top_k: int) -> asyncio.Future:
+		"""Queue one task; raises `asyncio.QueueFull` when the backlog limit is reached."""
+		future = asyncio.get_running_loop().create_future()
+		self.queue.put_nowait(_Pending(text, top_k, future))
+		return future
+
+	async def _collect(self) -> List[_Pending]:
+		batch = [await self.queue.get()]
+		deadline = time.perf_counter() + self.window
+		while len(batch) < self.max_batch:
+			timeout = deadline - time.perf_counter()
+			if timeout <= 0:
+				break
+			try:
+				batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+			except asyncio.TimeoutError:
+				break
+		# Anything already queued rides along without extra waiting.
+		while len(batch) < self.max_batch and not self.queue.empty():
+			batch.append(self.queue.get_nowait())
+		return batch
+
+	def _score(self, texts: List[str], top_k: int) -> Tuple[List[List[Dict[str, Any]]], float]:
+		start = time.perf_counter()
+		index = load_api_index()
+		# Only the capability vectors are scored, so the semantic encoder is skipped.
+		a_t = compute_keyword_matrix([normalize_text(text).split() for text in texts])
+		idx, scores = capability_engine(index).top_k(a_t, top_k)
+		results = [
+			[
+				{"id": index.ids[i], "name": index.names[i], "score": float(s)}
+				for i, s in zip(row_idx, row_scores)
+			]
+			for row_idx, row_scores in zip(idx, scores)
+		]
+		return results, (time.perf_counter() - start) * 1000
+
+	async def _run(self) -> None:
+		loop = asyncio.get_running_loop()
+		while True:
+			batch = await self._collect()
+			live = [p for p in batch if not p.future.done()]
+			if not live:
+				continue
+			top_k = max(p.top_k for p in live)
+			try:
+				results, batch_ms = await loop.run_in_executor(None, self._score, [p.text for p in live], top_k)
+			except Exception as exc:
+				for p in live:
+					if not p.future.done():
+						p.future.set_exception(exc)
+				continue
+			self.batches += 1
+			self.tasks += len(live)
+			for p, ranked in zip(live, results):
+				if not p.future.done():
+					p.future.set_result({
+						"apis": ranked[:p.top_k],
+						"batch_size": len(live),
+						"batch_ms": batch_ms,
+						"queue_ms": (time.perf_counter() - p.enqueued) * 1000 - batch_ms,
+					})
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class SelectionServer:
+	def __init__(self, batcher: MicroBatcher, default_top_k: int = 5) -> None:
+		self.batcher = batcher
+		self.default_top_k = default_top_k
+		self.started = time.time()
+
+	async def _select(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+		top_k = payload.get("top_k", self.default_top_k)
+		if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+			return 400, {"error": "'top_k' must be a positive integer"}
+		if "tasks" in payload:
+			texts = payload["tasks"]
+			if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+				return 400, {"error": "'tasks' must be a list of strings"}
+		elif "task" in payload:
+			if not isinstance(payload["task"], str):
+				return 400, {"error": "'task' must be a string"}
+			texts = [payload["task"]]
+		else:
+			return 400, {"error": "expected 'task' or 'tasks'"}
+
+		queue = self.batcher.queue
+		if queue.maxsize - queue.qsize() < len(texts):
+			return 503, {"error": "selection queue is full, retry later"}
+		futures = [self.batcher.submit(text, top_k) for text in texts]
+		answers = await asyncio.gather(*futures)
+		results = [{"task": text, **answer} for text, answer in zip(texts, answers)]
+		if "task" in payload and "tasks" not in payload:
+			return 200, results[0]
+		return 200, {"results": results}
+
+	async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+		if path == "/health":
+			return 200, {
+				"status": "ok",
+				"uptime_s": time.time() - self.started,
+				"queued": self.batcher.queue.qsize(),
+				"batches": self.batcher.batches,
+				"tasks": self.batcher.tasks,
+			}
+		if path != "/select":
+			return 404, {"error": f"unknown path {path}"}
+		if method != "POST":
+			return 405, {"error": "use POST"}
+		try:
+			payload = json.loads(body or b"{}")
+		except json.JSONDecodeError as exc:
+			return 400, {"error": f"invalid JSON: {exc}"}
+		if not isinstance(payload, dict):
+			return 400, {"error": "expected a JSON object"}
+		return await self._select(payload)
+
+	async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		try:
+			while True:
+				try:
+					head = await reader.readuntil(b"\r\n\r\n")
+				except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+					break
+				lines = head.decode("latin-1").split("\r\n")
+				try:
+					method, path, version = lines[0].split(" ", 2)
+				except ValueError:
+					break
+				headers = {}
+				for line in lines[1:]:
+					if ":" in line:
+						k, v = line.split(":", 1)
+						headers[k.strip().lower()] = v.strip()
+
+				try:
+					length = int(headers.get("content-length", "0") or 0)
+				except ValueError:
+					length = -1
+				if length < 0:
+					# The body cannot be framed, so the connection is closed after replying.
+					status, payload = 400, {"error": "invalid Content-Length"}
+					keep_alive = False
+				elif length > MAX_BODY_BYTES:
+					status, payload = 413, {"error": "request body too large"}
+					keep_alive = False
+				else:
+					body = await reader.readexactly(length) if length else b""
+					try:
+						status, payload = await self._dispatch(method.upper(), path.split("?", 1)[0], body)
+					except Exception as exc:
+						status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+					keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+				data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+				writer.write(
+					f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+					f"Content-Type: application/json; charset=utf-8\r\n"
+					f"Content-Length: {len(data)}\r\n"
+					f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+				)
+				await writer.drain()
+				if not keep_alive:
+					break
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			writer.close()
+
+
+async def serve(
+	host: str = "127.0.0.1",
+	port: int = 8765,
+	unix_path: Optional[str] = None,
+	max_batch: int = 64,
+	window_ms: float = 5.0,
+	max_queue: int = 1024,
+) -> None:
+	# Load the index before accepting connections.
+	index = load_api_index()
+	capability_engine(index)
+
+	batcher = MicroBatcher(max_batch=max_batch, window_ms=window_ms, max_queue=max_queue)
+	batcher.start()
+	app = SelectionServer(batcher)
+
+	if unix_path:
+		server = await asyncio.start_unix_server(app.handle, path=unix_path)
+		where = unix_path
+	else:
+		server = await asyncio.start_server(app.handle, host=host, port=port)
+		where = f"http://{host}:{port}"
+	print(f"Serving {len(index)} APIs on {where} (batch<={max_batch}, window={window_ms}ms)")
+
+	try:
+		async with server:
+			await server.serve_forever()
+	finally:
+		await batcher.stop()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Resident tool-selection service.")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+	parser.add_argument("--max-batch", type=int, default=64, help="largest micro-batch")
+	parser.add_argument("--window-ms", type=float, default=5.0, help="how long to wait for a batch to fill")
+	parser.add_argument("--max-queue", type=int, default=1024, help="queued tasks before returning 503")
+	args = parser.parse_args()
+
+	try:
+		asyncio.run(serve(args.host, args.port, args.unix, args.max_batch, args.window_ms, args.max_queue))
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == "__main__":
+	main()
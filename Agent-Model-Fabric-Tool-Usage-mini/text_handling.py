@@ -9,13 +9,17 @@ This module produces:
 
 from __future__ import annotations
 
-import hashlib
 import re
+import threading
 from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from itertools import islice
+from typing import Iterable, List, Sequence, Tuple
 
 import numpy as np
 
+from embedding_cache import get_embedding_cache
+from hashing_vectorizer import HashingVectorizer
+from keyword_matcher import KeywordMatcher
 from keywords_conf import KEYWORDS
 
 
@@ -31,6 +35,19 @@ class TaskVectors:
 	z_t: np.ndarray
 
 
+@dataclass
+class TaskBatch:
+	"""Stacked task vectors; row i of every array belongs to `normalized_texts[i]`."""
+
+	normalized_texts: List[str]
+	a_t: np.ndarray
+	z_sem: np.ndarray
+	z_t: np.ndarray
+
+	def __len__(self) -> int:
+		return len(self.normalized_texts)
+
+
 def normalize_text(text: str) -> str:
 	"""Lowercase and strip non-alphanumeric chars while keeping spaces."""
 	lowered = text.lower()
@@ -47,50 +64,156 @@ def _sigmoid(x: np.ndarray) -> np.ndarray:
 	return 1 / (1 + np.exp(-x))
 
 
+_KEYWORD_MATCHER: KeywordMatcher | None = None
+
+
+def keyword_matcher() -> KeywordMatcher:
+	"""`KEYWORDS` compiled into a token/phrase -> capability bitmask index (built once)."""
+	global _KEYWORD_MATCHER
+	if _KEYWORD_MATCHER is None:
+		_KEYWORD_MATCHER = KeywordMatcher(KEYWORDS, CAPABILITY_ORDER, normalize_text)
+	return _KEYWORD_MATCHER
+
+
 def compute_keyword_vector(tokens: Iterable[str]) -> np.ndarray:
 	"""Count keyword hits per capability and squash with sigmoid."""
-	counts = []
-	token_set = list(tokens)
-	for key in CAPABILITY_ORDER:
-		vocab = KEYWORDS.get(key, [])
-		hits = sum(1 for t in token_set if t in vocab)
-		counts.append(hits)
-	return _sigmoid(np.array(counts, dtype=float))
+	return _sigmoid(keyword_matcher().count(tokens))
+
+
+def compute_keyword_matrix(token_lists: Sequence[Sequence[str]]) -> np.ndarray:
+	"""Bulk `compute_keyword_vector`: one `(n, len(CAPABILITY_ORDER))` row per token list."""
+	return _sigmoid(keyword_matcher().count_many(token_lists))
+
+
+SBERT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Fallback encoder used when SBERT is unavailable (see `configure_hash_fallback`).
+_HASH_VECTORIZER = HashingVectorizer()
+HASH_FALLBACK_NAME = _HASH_VECTORIZER.identity
+
+
+def configure_hash_fallback(**kwargs) -> HashingVectorizer:
+	"""Replace the fallback vectorizer, e.g. `configure_hash_fallback(n_features=4096)`."""
+	global _HASH_VECTORIZER, HASH_FALLBACK_NAME
+	_HASH_VECTORIZER = HashingVectorizer(**kwargs)
+	HASH_FALLBACK_NAME = _HASH_VECTORIZER.identity
+	return _HASH_VECTORIZER
 
 
 def _load_sentence_model():
 	try:
 		from sentence_transformers import SentenceTransformer
 
-		return SentenceTransformer("all-MiniLM-L6-v2")
+		return SentenceTransformer(SBERT_MODEL_NAME)
 	except Exception:
 		return None
 
 
-_SBERT_MODEL = _load_sentence_model()
+# Loaded on first semantic use (see `_get_sentence_model`) so keyword-only
+# callers never import sentence_transformers / torch.
+_SBERT_MODEL = None
+_SBERT_LOADED = False
+_SBERT_LOCK = threading.Lock()
+
+
+def _get_sentence_model():
+	global _SBERT_MODEL, _SBERT_LOADED
+	if not _SBERT_LOADED:
+		with _SBERT_LOCK:
+			if not _SBERT_LOADED:
+				_SBERT_MODEL = _load_sentence_model()
+				_SBERT_LOADED = True
+	return _SBERT_MODEL
+
+
+def warm_up() -> bool:
+	"""Load the sentence model now instead of on the first request; True if SBERT is usable."""
+	return _get_sentence_model() is not None
+
+
+def embedding_backend() -> str:
+	"""Identify the encoder behind `compute_semantic_embedding` (loads the model if needed)."""
+	if _get_sentence_model() is not None:
+		return f"sbert:{SBERT_MODEL_NAME}"
+	return HASH_FALLBACK_NAME
 
 
 def compute_semantic_embedding(text: str) -> np.ndarray:
-	"""Return semantic embedding; fallback to simple hash vector if SBERT unavailable."""
+	"""Return semantic embedding; fallback to simple hash vector if SBERT unavailable.
 
-	if _SBERT_MODEL is not None:
+	SBERT results are cached per (backend, text) in the in-memory level of the
+	process-wide `EmbeddingCache`. The hashing fallback is cheaper than a cache
+	lookup, so it is never cached.
+	"""
+
+	model = _get_sentence_model()
+	if model is not None:
+		cache = get_embedding_cache()
+		backend = embedding_backend()
+		cached = cache.get(backend, text)
+		if cached is not None:
+			return cached
 		try:
-			vec = _SBERT_MODEL.encode(text, normalize_embeddings=True)
-			return np.asarray(vec, dtype=float)
+			vec = np.asarray(model.encode(text, normalize_embeddings=True), dtype=float)
+			cache.put(backend, text, vec)
+			return vec
 		except Exception:
 			pass
 
-	# Fallback: hash-based 64-dim bag-of-words style vector
-	tokens = _tokenize(text)
-	dim = 64
-	vec = np.zeros(dim, dtype=float)
-	for tok in tokens:
-		h = int(hashlib.md5(tok.encode("utf-8")).hexdigest(), 16)
-		idx = h % dim
-		vec[idx] += 1.0
-	if np.linalg.norm(vec) > 0:
-		vec = vec / np.linalg.norm(vec)
-	return vec
+	return _hash_embedding(text)
+
+
+def _hash_embedding(text: str) -> np.ndarray:
+	"""Fallback: feature-hashing bag of words/bigrams (see `hashing_vectorizer`)."""
+	return _HASH_VECTORIZER.transform_one(_tokenize(text))
+
+
+def _encode_bucketed(model, texts: Sequence[str], batch_size: int) -> np.ndarray:
+	"""Encode texts in length-sorted batches so each batch pads to a similar length."""
+	order = sorted(range(len(texts)), key=lambda i: len(texts[i].split()))
+	rows: List[np.ndarray] = [np.empty(0)] * len(texts)
+	for start in range(0, len(order), batch_size):
+		chunk = order[start:start + batch_size]
+		vecs = model.encode(
+			[texts[i] for i in chunk],
+			batch_size=batch_size,
+			normalize_embeddings=True,
+		)
+		for i, vec in zip(chunk, vecs):
+			rows[i] = np.asarray(vec, dtype=float)
+	return np.stack(rows)
+
+
+def compute_semantic_embeddings(texts: Sequence[str], batch_size: int = 32, persist: bool = False) -> np.ndarray:
+	"""Batch version of `compute_semantic_embedding`; returns an `(n, d)` matrix.
+
+	`persist=True` also reads and writes the on-disk cache level; index builds
+	set it so rebuilds skip the encoder.
+	"""
+
+	if not texts:
+		return np.zeros((0, 0), dtype=float)
+
+	model = _get_sentence_model()
+	if model is not None:
+		cache = get_embedding_cache()
+		backend = embedding_backend()
+		rows: List[np.ndarray | None] = cache.get_many(backend, texts, disk=persist)
+		missing = [i for i, row in enumerate(rows) if row is None]
+		if not missing:
+			return np.stack(rows)
+		try:
+			encoded = _encode_bucketed(model, [texts[i] for i in missing], max(1, batch_size))
+		except Exception:
+			# Redo every row with the fallback so the matrix stays in one embedding space.
+			encoded = None
+		if encoded is not None:
+			for i, vec in zip(missing, encoded):
+				rows[i] = vec
+			cache.put_many(backend, [texts[i] for i in missing], encoded, disk=persist)
+			return np.stack(rows)
+
+	return _HASH_VECTORIZER.transform_dense([_tokenize(text) for text in texts])
 
 
 def fuse_vectors(z_sem: np.ndarray, a_t: np.ndarray, lam: float = 1.0) -> np.ndarray:
@@ -104,3 +227,37 @@ def process_task(text: str, lam: float = 1.0) -> TaskVectors:
 	z_sem = compute_semantic_embedding(normalized)
 	z_t = fuse_vectors(z_sem, a_t, lam)
 	return TaskVectors(normalized_text=normalized, a_t=a_t, z_sem=z_sem, z_t=z_t)
+
+
+def process_tasks(
+	texts: Iterable[str],
+	lam: float = 1.0,
+	batch_size: int = 32,
+	bucket_window: int = 1024,
+) -> TaskBatch:
+	"""Vectorize many tasks at once.
+
+	Texts are consumed `bucket_window` at a time; within each window they are
+	length-bucketed and embedded `batch_size` per encoder call.
+	"""
+
+	it = iter(texts)
+	normalized: List[str] = []
+	a_blocks: List[np.ndarray] = []
+	z_blocks: List[np.ndarray] = []
+	while True:
+		window = [normalize_text(text) for text in islice(it, max(1, bucket_window))]
+		if not window:
+			break
+		normalized.extend(window)
+		a_blocks.append(compute_keyword_matrix([text.split() for text in window]))
+		z_blocks.append(compute_semantic_embeddings(window, batch_size=batch_size))
+
+	if not normalized:
+		empty = np.zeros((0, len(CAPABILITY_ORDER)), dtype=float)
+		return TaskBatch(normalized_texts=[], a_t=empty, z_sem=np.zeros((0, 0)), z_t=empty.copy())
+
+	a_t = np.vstack(a_blocks)
+	z_sem = np.vstack(z_blocks)
+	z_t = np.hstack([z_sem, lam * a_t])
+	return TaskBatch(normalized_texts=normalized, a_t=a_t, z_sem=z_sem, z_t=z_t)
@@ -0,0 +1,371 @@
+"""Tool-transition graph for predicting the next API in multi-step trajectories.
+
+Usage:
+	python tool_transitions.py trajectories.jsonl [--output graph.npz] [--min-confidence 0.6]
+
+Agents tend to reuse the same tool chains (tool-usage inertia), so the next
+API is often predictable from the previous one or two. The graph counts
+`prev -> next` transitions and `(prev2, prev) -> next` contexts over logged
+trajectories, plus parameter-passing edges (a value produced by one step and
+consumed as an argument by a later step).
+
+After `freeze()` the transitions are stored as CSR arrays over integer tool
+ids, and the most likely successor of every context is precomputed, so
+`predict` is a constant number of dict/array lookups. `NextToolSelector`
+only calls the full `process_task` + `score_apis` scorer when the graph's
+confidence is below the threshold.
+
+A trajectory is a list of steps; a step is a tool name or a dict with the tool
+under `api` / `api_name` / `tool` / `name` / `action`, arguments under
+`arguments` / `args` / `parameters` / `action_input` and the result under
+`output` / `result` / `observation` (JSON strings are decoded).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from text_handling import process_task
+from tool_usage import score_apis
+
+_TOOL_KEYS = ("api", "api_name", "tool", "name", "action")
+_ARG_KEYS = ("arguments", "args", "parameters", "action_input")
+_OUTPUT_KEYS = ("output", "result", "observation")
+
+# Shorter values ("1", "ok") are too common to count as parameter passing.
+_MIN_PASSED_VALUE_LEN = 3
+
+
+@dataclass
+class Step:
+	tool: str
+	arguments: Dict[str, Any]
+	output: Any = None
+
+
+@dataclass
+class Prediction:
+	tool: str
+	confidence: float
+	support: int
+	order: int
+
+
+def _first(obj: Dict[str, Any], keys: Sequence[str]) -> Any:
+	for key in keys:
+		if obj.get(key) is not None:
+			return obj[key]
+	return None
+
+
+def _maybe_json(value: Any) -> Any:
+	if isinstance(value, str):
+		try:
+			return json.loads(value)
+		except ValueError:
+			return value
+	return value
+
+
+def parse_step(raw: Any) -> Optional[Step]:
+	if isinstance(raw, str):
+		return Step(tool=raw, arguments={})
+	if not isinstance(raw, dict):
+		return None
+	tool = _first(raw, _TOOL_KEYS)
+	if not tool:
+		return None
+	args = _maybe_json(_first(raw, _ARG_KEYS))
+	return Step(tool=str(tool), arguments=args if isinstance(args, dict) else {}, output=_maybe_json(_first(raw, _OUTPUT_KEYS)))
+
+
+def iter_trajectories(path: str) -> Iterator[List[Step]]:
+	"""Read trajectories from JSONL (one per line) or a JSON array.
+
+	Each entry is a list of steps or an object holding one under
+	`trajectory` / `steps` / `api_calls`.
+	"""
+	text = Path(path).read_text(encoding="utf-8")
+	if Path(path).suffix.lower() in (".jsonl", ".ndjson"):
+		entries: Iterable[Any] = (json.loads(line) for line in text.splitlines() if line.strip())
+	else:
+		data = json.loads(text)
+		entries = data if isinstance(data, list) else [data]
+	for entry in entries:
+		if isinstance(entry, dict):
+			entry = entry.get("trajectory") or entry.get("steps") or entry.get("api_calls") or []
+		steps = [step for step in (parse_step(raw) for raw in entry) if step is not None]
+		if steps:
+			yield steps
+
+
+def _scalars(value: Any) -> Iterator[str]:
+	"""Leaf values of a (possibly nested) output as strings."""
+	if isinstance(value, dict):
+		for item in value.values():
+			yield from _scalars(item)
+	elif isinstance(value, (list, tuple)):
+		for item in value:
+			yield from _scalars(item)
+	elif value is not None and not isinstance(value, bool):
+		text = str(value).strip()
+		if len(text) >= _MIN_PASSED_VALUE_LEN:
+			yield text
+
+
+class ToolTransitionGraph:
+	"""Transition counts between tools with O(1) next-tool prediction."""
+
+	def __init__(self) -> None:
+		self.tools: List[str] = []
+		self._tool_ids: Dict[str, int] = {}
+		self._pairs: Counter = Counter()
+		self._triples: Counter = Counter()
+		self._params: Counter = Counter()
+		self._frozen = False
+
+		# Filled by `freeze()`.
+		self.indptr = np.zeros(1, dtype=np.int64)
+		self.targets = np.zeros(0, dtype=np.int32)
+		self.counts = np.zeros(0, dtype=np.int32)
+		self.best_next = np.zeros(0, dtype=np.int32)
+		self.best_count = np.zeros(0, dtype=np.int32)
+		self.out_total = np.zeros(0, dtype=np.int32)
+		self._context2: Dict[int, Tuple[int, int, int]] = {}
+
+	def __len__(self) -> int:
+		return len(self.tools)
+
+	def _tool_id(self, tool: str) -> int:
+		tid = self._tool_ids.get(tool)
+		if tid is None:
+			tid = len(self.tools)
+			self._tool_ids[tool] = tid
+			self.tools.append(tool)
+		return tid
+
+	def add_trajectory(self, steps: Sequence[Step | str]) -> None:
+		steps = [step for step in (parse_step(s) if not isinstance(s, Step) else s for s in steps) if step is not None]
+		ids = [self._tool_id(step.tool) for step in steps]
+		for a, b in zip(ids, ids[1:]):
+			self._pairs[a, b] += 1
+		for a, b, c in zip(ids, ids[1:], ids[2:]):
+			self._triples[a, b, c] += 1
+
+		# value -> id of the latest step that produced it
+		produced: Dict[str, int] = {}
+		for tid, step in zip(ids, steps):
+			for param, value in step.arguments.items():
+				for text in _scalars(value):
+					src = produced.get(text)
+					if src is not None:
+						self._params[src, tid, str(param)] += 1
+						break
+			for text in _scalars(step.output):
+				produced[text] = tid
+		self._frozen = False
+
+	@classmethod
+	def from_trajectories(cls, trajectories: Iterable[Sequence[Step | str]]) -> "ToolTransitionGraph":
+		graph = cls()
+		for steps in trajectories:
+			graph.add_trajectory(steps)
+		return graph.freeze()
+
+	def freeze(self) -> "ToolTransitionGraph":
+		"""Compile counts into CSR adjacency plus per-context argmax tables."""
+		n = len(self.tools)
+		if self._pairs:
+			keys = np.array(list(self._pairs.keys()), dtype=np.int64)
+			vals = np.fromiter(self._pairs.values(), dtype=np.int64, count=len(self._pairs))
+		else:
+			keys = np.zeros((0, 2), dtype=np.int64)
+			vals = np.zeros(0, dtype=np.int64)
+		# Sort by source, then count descending, then target (deterministic ties).
+		order = np.lexsort((keys[:, 1], -vals, keys[:, 0]))
+		src, dst, cnt = keys[order, 0], keys[order, 1], vals[order]
+
+		self.indptr = np.searchsorted(src, np.arange(n + 1)).astype(np.int64)
+		self.targets = dst.astype(np.int32)
+		self.counts = cnt.astype(np.int32)
+		self.out_total = np.bincount(src, weights=cnt, minlength=n).astype(np.int32)
+		has_out = self.indptr[1:] > self.indptr[:-1]
+		first = np.minimum(self.indptr[:-1], max(len(dst) - 1, 0))
+		self.best_next = np.where(has_out, self.targets[first] if len(dst) else -1, -1).astype(np.int32)
+		self.best_count = np.where(has_out, self.counts[first] if len(dst) else 0, 0).astype(np.int32)
+
+		# (prev2, prev) -> (best next, its count, total); ties go to the lower tool id.
+		best: Dict[int, Tuple[int, int, int]] = {}
+		for (a, b, c), count in sorted(self._triples.items()):
+			key = a * n + b
+			tool, top, total = best.get(key, (-1, 0, 0))
+			if count > top:
+				tool, top = c, count
+			best[key] = (tool, top, total + count)
+		self._context2 = best
+		self._frozen = True
+		return self
+
+	def successors(self, tool: str) -> List[Tuple[str, int]]:
+		"""Observed next tools for `tool`, most frequent first."""
+		tid = self._tool_ids.get(tool)
+		if tid is None:
+			return []
+		start, end = self.indptr[tid], self.indptr[tid + 1]
+		return [(self.tools[t], int(c)) for t, c in zip(self.targets[start:end], self.counts[start:end])]
+
+	def parameter_edges(self, tool: Optional[str] = None) -> List[Tuple[str, str, str, int]]:
+		"""`(source, target, parameter, count)` edges, optionally only those leaving `tool`."""
+		tid = self._tool_ids.get(tool) if tool is not None else None
+		edges = [
+			(self.tools[s], self.tools[t], param, count)
+			for (s, t, param), count in self._params.items()
+			if tid is None or s == tid
+		]
+		return sorted(edges, key=lambda e: (-e[3], e[0], e[1], e[2]))
+
+	def predict(self, previous: Sequence[str], min_support: int = 1) -> Optional[Prediction]:
+		"""Most likely next tool after `previous` (last element = most recent step).
+
+		The two-step context is used when it has been seen at least
+		`min_support` times, otherwise the last tool alone.
+		"""
+		if not self._frozen:
+			self.freeze()
+		if not previous:
+			return None
+		last = self._tool_ids.get(previous[-1])
+		if last is None:
+			return None
+		if len(previous) >= 2:
+			before = self._tool_ids.get(previous[-2])
+			if before is not None:
+				hit = self._context2.get(before * len(self.tools) + last)
+				if hit is not None and hit[2] >= min_support:
+					return Prediction(self.tools[hit[0]], hit[1] / hit[2], hit[2], 2)
+		total = int(self.out_total[last])
+		if total < min_support or self.best_next[last] < 0:
+			return None
+		return Prediction(self.tools[self.best_next[last]], int(self.best_count[last]) / total, total, 1)
+
+	def save(self, path: str) -> None:
+		if not self._frozen:
+			self.freeze()
+		ctx_keys = np.array(sorted(self._context2), dtype=np.int64)
+		ctx_vals = np.array([self._context2[k] for k in ctx_keys], dtype=np.int64).reshape(-1, 3)
+		params = self.parameter_edges()
+		np.savez(
+			path,
+			tools=np.array(self.tools, dtype=str),
+			pairs=np.array([(s, t, c) for (s, t), c in sorted(self._pairs.items())], dtype=np.int64).reshape(-1, 3),
+			context_keys=ctx_keys,
+			context_vals=ctx_vals,
+			triples=np.array([(a, b, c, n) for (a, b, c), n in sorted(self._triples.items())], dtype=np.int64).reshape(-1, 4),
+			param_edges=np.array([(self._tool_ids[s], self._tool_ids[t], n) for s, t, _, n in params], dtype=np.int64).reshape(-1, 3),
+			param_names=np.array([p for _, _, p, _ in params], dtype=str),
+		)
+
+	@classmethod
+	def load(cls, path: str) -> "ToolTransitionGraph":
+		data = np.load(path, allow_pickle=False)
+		graph = cls()
+		for tool in data["tools"]:
+			graph._tool_id(str(tool))
+		for s, t, c in data["pairs"]:
+			graph._pairs[int(s), int(t)] = int(c)
+		for a, b, c, n in data["triples"]:
+			graph._triples[int(a), int(b), int(c)] = int(n)
+		for (s, t, n), param in zip(data["param_edges"], data["param_names"]):
+			graph._params[int(s), int(t), str(param)] = int(n)
+		return graph.freeze()
+
+
+@dataclass
+class Selection:
+	api: str
+	score: float
+	source: str
+
+
+class NextToolSelector:
+	"""Predict the next API from the graph; fall back to the full scorer when unsure."""
+
+	def __init__(self, graph: ToolTransitionGraph, min_confidence: float = 0.6, min_support: int = 3, lam: float = 1.0) -> None:
+		self.graph = graph
+		self.min_confidence = min_confidence
+		self.min_support = min_support
+		self.lam = lam
+		self.graph_hits = 0
+		self.fallbacks = 0
+
+	def select(self, task: str, previous: Sequence[str] = ()) -> Selection:
+		prediction = self.graph.predict(previous, self.min_support)
+		if prediction is not None and prediction.confidence >= self.min_confidence:
+			self.graph_hits += 1
+			return Selection(prediction.tool, prediction.confidence, "graph")
+
+		self.fallbacks += 1
+		vectors = process_task(task, self.lam)
+		api, score = score_apis(vectors.a_t, vectors.z_sem, top_k=1)[0]
+		return Selection(api.name, score, "scorer")
+
+
+def evaluate(graph: ToolTransitionGraph, trajectories: Iterable[Sequence[Step]], min_confidence: float, min_support: int) -> Dict[str, float]:
+	"""Share of steps the graph answers on its own and how often it is right."""
+	steps = answered = correct = 0
+	for trajectory in trajectories:
+		tools = [step.tool for step in trajectory]
+		for i in range(1, len(tools)):
+			steps += 1
+			prediction = graph.predict(tools[:i], min_support)
+			if prediction is not None and prediction.confidence >= min_confidence:
+				answered += 1
+				correct += prediction.tool == tools[i]
+	return {
+		"steps": steps,
+		"coverage": answered / steps if steps else 0.0,
+		"precision": correct / answered if answered else 0.0,
+	}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Build a tool-transition graph from trajectories.")
+	parser.add_argument("trajectories", help="JSON / JSONL file of tool-call trajectories")
+	parser.add_argument("--output", "-o", default=None, help="save the graph as .npz")
+	parser.add_argument("--min-confidence", type=float, default=0.6, help="confidence needed to skip the scorer")
+	parser.add_argument("--min-support", type=int, default=3, help="observations needed for a context")
+	args = parser.parse_args()
+
+	trajectories = list(iter_trajectories(args.trajectories))
+	graph = ToolTransitionGraph.from_trajectories(trajectories)
+	print(f"{len(trajectories)} trajectories, {len(graph)} tools, {len(graph.targets)} transitions, {len(graph.parameter_edges())} parameter edges")
+
+	stats = evaluate(graph, trajectories, args.min_confidence, args.min_support)
+	print(f"Graph answers {stats['coverage']:.1%} of {stats['steps']} steps with {stats['precision']:.1%} precision (in-sample)")
+
+	if args.output:
+		graph.save(args.output)
+		print(f"Graph written to {args.output}")
+
+
+__all__ = [
+	"NextToolSelector",
+	"Prediction",
+	"Selection",
+	"Step",
+	"ToolTransitionGraph",
+	"evaluate",
+	"iter_trajectories",
+	"parse_step",
+]
+
+
+if __name__ == "__main__":
+	main()
@@ -2,32 +2,143 @@
 
 from __future__ import annotations
 
-from typing import List, Sequence, Tuple
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-from api_bank_load import APIDoc, load_api_bank
+from api_index import DEFAULT_CACHE_DIR, APIIndex, APIRow, load_api_index
+from semantic_index import SemanticIndex, api_vectors
+from vector_ops import normalize_rows, top_k_rows
 
 
-def _cosine(u: np.ndarray, v: np.ndarray) -> float:
-	if u.size == 0 or v.size == 0:
-		return 0.0
-	denom = np.linalg.norm(u) * np.linalg.norm(v)
-	if denom == 0:
-		return 0.0
-	return float(np.dot(u, v) / denom)
+class ScoringEngine:
+	"""Cosine scorer over a fixed API matrix.
+
+	Rows are L2-normalized once into a contiguous matrix, so a batch of task
+	vectors is scored with a single matrix multiply.
+	"""
+
+	def __init__(self, matrix: np.ndarray, ids: Sequence[str] | np.ndarray | None = None) -> None:
+		matrix = np.ascontiguousarray(np.atleast_2d(matrix), dtype=float)
+		self._matrix = normalize_rows(matrix)
+		# Anything indexable by an integer array (ndarray, `TextColumn`).
+		self.ids = ids if ids is not None else np.arange(matrix.shape[0])
+
+	def __len__(self) -> int:
+		return int(self._matrix.shape[0])
+
+	@property
+	def dim(self) -> int:
+		return int(self._matrix.shape[1])
+
+	def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+		"""Return the `(n_tasks, n_apis)` cosine matrix for `(n_tasks, dim)` queries.
+
+		With `rows`, only those API positions are scored (columns follow `rows`).
+		"""
+		q = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=float)))
+		matrix = self._matrix if rows is None else self._matrix[rows]
+		return q @ matrix.T
+
+	def top_k(self, queries: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+		"""Return row positions and scores of the best `top_k` APIs per task."""
+		return top_k_rows(self.scores(queries), top_k)
+
+	def search(self, queries: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+		"""Return API ids and scores, each shaped `(n_tasks, top_k)`."""
+		idx, scores = self.top_k(queries, top_k)
+		return self.ids[idx], scores
+
+
+_ENGINES: Dict[str, ScoringEngine] = {}
+_ENGINE_LOCK = threading.Lock()
+
+
+def capability_engine(index: APIIndex | None = None) -> ScoringEngine:
+	"""Scoring engine over the index's `a_API` matrix (rebuilt when the index changes)."""
+	if index is None:
+		index = load_api_index()
+	with _ENGINE_LOCK:
+		engine = _ENGINES.get(index.fingerprint)
+		if engine is None:
+			_ENGINES.clear()
+			engine = ScoringEngine(index.capabilities, index.ids)
+			_ENGINES[index.fingerprint] = engine
+		return engine
 
 
-def score_apis(a_t: np.ndarray, z_sem: np.ndarray | None = None, top_k: int = 5) -> List[Tuple[APIDoc, float]]:
+def score_apis(a_t: np.ndarray, z_sem: np.ndarray | None = None, top_k: int = 5) -> List[Tuple[APIRow, float]]:
 	"""Compute cosine scores between task capability vector and APIs.
 
 	z_sem is accepted for future extensions; current scoring uses a_T vs a_API.
 	"""
 
-	apis = load_api_bank()
-	scored = [(api, _cosine(a_t, api.a_api)) for api in apis]
-	scored.sort(key=lambda x: x[1], reverse=True)
-	return scored[:top_k]
+	index = load_api_index()
+	idx, scores = capability_engine(index).top_k(a_t, top_k)
+	return [(index.row(i), float(s)) for i, s in zip(idx[0], scores[0])]
+
+
+_SEMANTIC_INDEXES: Dict[Tuple[Any, ...], SemanticIndex] = {}
+
+RERANK_DIR = DEFAULT_CACHE_DIR / "rerank"
+
+
+def rerank_path(index: APIIndex, lam: Optional[float] = None) -> Path:
+	"""Memory-mapped float32 re-ranking rows for `index` in the `z_sem` (lam=None) or `z_T` space."""
+	space = "sem" if lam is None else f"lam{float(lam)!r}"
+	return RERANK_DIR / f"{index.fingerprint[:16]}_{space}.npy"
+
+
+def semantic_index(lam: Optional[float] = None, mode: str = "exact", precision: str = "full", **kwargs) -> SemanticIndex:
+	"""Nearest-neighbour index over API embeddings (`z_sem` space, or `z_T` space when `lam` is set).
+
+	With a quantized `precision` the compressed rows are scanned and the
+	shortlist is re-ranked against normalized float32 rows memory-mapped from
+	`rerank_path` (written on first use).
+	"""
+	index = load_api_index(with_embeddings=True)
+	# Build options (n_lists, block_size, rerank, ...) change the index, so they are part of the key.
+	key = (index.fingerprint, lam, mode, precision, tuple(sorted(kwargs.items())))
+	with _ENGINE_LOCK:
+		sem = _SEMANTIC_INDEXES.get(key)
+		if sem is None:
+			for stale in [k for k in _SEMANTIC_INDEXES if k[0] != index.fingerprint]:
+				del _SEMANTIC_INDEXES[stale]
+			vectors = api_vectors(index.embeddings, index.capabilities, lam, lazy=precision != "full")
+			if precision != "full":
+				kwargs.setdefault("rerank_path", str(rerank_path(index, lam)))
+				# Re-ranking rows of superseded indexes (processes still mapping them keep their open files).
+				for old in RERANK_DIR.glob("*.npy"):
+					if not old.name.startswith(index.fingerprint[:16]):
+						old.unlink(missing_ok=True)
+			sem = SemanticIndex(vectors, index.ids, mode=mode, precision=precision, **kwargs)
+			_SEMANTIC_INDEXES[key] = sem
+		return sem
+
+
+def semantic_apis(
+	query: np.ndarray,
+	lam: Optional[float] = None,
+	top_k: int = 5,
+	mode: str = "exact",
+	n_probe: Optional[int] = None,
+	precision: str = "full",
+) -> List[Tuple[APIRow, float]]:
+	"""Retrieve APIs by `z_sem` (lam=None) or by the fused `z_T` built with the same `lam`."""
+
+	index = load_api_index(with_embeddings=True)
+	idx, scores = semantic_index(lam, mode, precision).top_k(query, top_k, n_probe)
+	return [(index.row(i), float(s)) for i, s in zip(idx[0], scores[0]) if i >= 0]
 
 
-__all__ = ["score_apis"]
+__all__ = [
+	"RERANK_DIR",
+	"ScoringEngine",
+	"capability_engine",
+	"rerank_path",
+	"score_apis",
+	"semantic_apis",
+	"semantic_index",
+]
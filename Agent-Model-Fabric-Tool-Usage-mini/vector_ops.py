@@ -0,0 +1,55 @@
+"""Small NumPy helpers shared by the scoring engines."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+	"""L2-normalize each row; all-zero rows stay zero."""
+	norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+	return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+	"""Partial top-k per row; ties keep the lower column first (same order as a stable sort)."""
+	n_rows, n_cols = scores.shape
+	k = min(k, n_cols)
+	if k <= 0:
+		return np.zeros((n_rows, 0), dtype=np.intp), np.zeros((n_rows, 0), dtype=scores.dtype)
+
+	if k < n_cols:
+		part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+	else:
+		part = np.broadcast_to(np.arange(n_cols), (n_rows, n_cols))
+	part_scores = np.take_along_axis(scores, part, axis=1)
+	order = np.lexsort((part, -part_scores), axis=-1)
+	idx = np.take_along_axis(part, order, axis=1)
+
+	if k < n_cols:
+		# A row whose k-th value is tied with columns argpartition left out may have kept
+		# the wrong ones; only those rows are re-ranked so ties resolve by position.
+		kth = part_scores.min(axis=1)
+		for r in np.flatnonzero((scores >= kth[:, None]).sum(axis=1) > k):
+			cand = np.flatnonzero(scores[r] >= kth[r])
+			idx[r] = cand[np.lexsort((cand, -scores[r, cand]))[:k]]
+	return idx, np.take_along_axis(scores, idx, axis=1)
+
+
+def merge_top_k(
+	idx_a: np.ndarray,
+	scores_a: np.ndarray,
+	idx_b: np.ndarray,
+	scores_b: np.ndarray,
+	k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""Merge two per-row candidate lists (global indices) into the best `k`, ties by index."""
+	idx = np.concatenate([idx_a, idx_b], axis=1)
+	scores = np.concatenate([scores_a, scores_b], axis=1)
+	order = np.lexsort((idx, -scores), axis=-1)[:, :k]
+	return np.take_along_axis(idx, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+__all__ = ["merge_top_k", "normalize_rows", "top_k_rows"]
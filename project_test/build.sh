@@ -109,7 +109,8 @@ echo "      export HUGGINGFACE_TOKEN='你的token'"
 echo "      export OPENAI_API_KEY='你的token'"
 echo "   2. 运行程序:"
 echo "      python main.py 或"
-echo "      python main.py \"测试文本\""
+echo "      python main.py \"测试文本\" 或   (文本生成默认流式输出，加 --no-stream 关闭)"
+echo "      python main.py --batch tasks.txt   (批处理，每行一个任务，- 表示从 stdin 读)"
 echo "   3. 退出虚拟环境:"
 echo "      deactivate"
 echo ""
@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 import os
 import sys
+import atexit
 import json
-import httpx
+import time
 from openai import OpenAI
 from pathlib import Path
 from datetime import datetime
 
 # 导入所有 HuggingFace 模型函数
-from src.TextGeneration import textGeneration
+from src.TextGeneration import textGeneration, textGenerationStream
 from src.Summarization import summarization
 from src.QuestionAnswering import question_answering
 from src.Translation import translation
 from src.TexttoImage import text_to_image
 from src.FeatureExtraction import feature_extraction
+from src.ClientPool import get_http_client
+from src.TaskRouter import TaskRouter
+from src.SelectionCache import SelectionCache
+from src.ResultSink import FileSink, new_id, open_sink
+from src.VectorStore import open_vector_store
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 
@@ -21,12 +27,10 @@ if not OPENAI_API_KEY:
     print("请先在环境变量中设置 OPENAI_API_KEY（或使用 .env 文件并加载）。")
     sys.exit(1)
     
-# 创建 OpenAI 客户端对象
+# 创建 OpenAI 客户端对象（复用共享连接池，keep-alive / HTTP/2）
 client = OpenAI(
     api_key=OPENAI_API_KEY,
-    http_client=httpx.Client(
-        timeout=30.0
-    )
+    http_client=get_http_client(30.0)
 )
 
 
@@ -42,8 +46,9 @@ def load_model_info():
 
 def get_user_input():
     """获取用户输入"""
-    if len(sys.argv) > 1:
-        return " ".join(sys.argv[1:])
+    args = [arg for arg in sys.argv[1:] if arg != "--no-stream"]
+    if args:
+        return " ".join(args)
     print("请输入你的任务描述（结束后按 Enter）：")
     return sys.stdin.readline().strip()
 
@@ -110,8 +115,61 @@ def select_model_with_gpt(task_description: str, model_info: dict):
         return {"task_type": "NONE", "prompt": "", "additional_params": {}}
 
 
-def execute_task(task_type: str, prompt: str, additional_params: dict, model_info: dict):
-    """执行选定的任务"""
+_ROUTER = None
+_CACHE = None
+
+
+def get_task_router(model_info: dict):
+    """本地任务路由；设置环境变量 TASK_ROUTER=0 可以关闭（返回 None）"""
+    global _ROUTER
+    if _ROUTER is None and os.getenv("TASK_ROUTER", "1").strip() != "0":
+        _ROUTER = TaskRouter(model_info)
+    return _ROUTER
+
+
+def get_selection_cache():
+    """ChatGPT 选择结果的缓存；设置环境变量 SELECTION_CACHE=0 可以关闭"""
+    global _CACHE
+    if _CACHE is None and os.getenv("SELECTION_CACHE", "1").strip() != "0":
+        _CACHE = SelectionCache.from_env()
+        # put 只是攒着，退出时把没保存的条目写回文件
+        atexit.register(_CACHE.flush)
+    return _CACHE
+
+
+def select_model(task_description: str, model_info: dict):
+    """
+    先用本地路由选模型，不确定时查缓存，都没有结果再调用 ChatGPT
+    设置环境变量 TASK_ROUTER=0 可以关闭本地路由
+    返回 select_model_with_gpt 格式的字典；缓存命中时额外带 "cache"（命中类型），本地路由的 "confidence" 打印后去掉
+    """
+    router = get_task_router(model_info)
+    if router is not None:
+        start = time.perf_counter()
+        selection = router.route(task_description)
+        elapsed = (time.perf_counter() - start) * 1000
+        if selection is not None:
+            confidence = selection.pop("confidence")
+            print(f"\n[本地路由] {selection['task_type']}（置信度 {confidence:.2f}，用时 {elapsed:.3f} ms）\n")
+            return selection
+        print("[本地路由] 不确定，交给 ChatGPT")
+
+    cache = get_selection_cache()
+    if cache is not None:
+        selection = cache.get(task_description)
+        if selection is not None:
+            print(f"\n[选择缓存] 命中（{selection['cache']}）: {selection['task_type']}\n")
+            return selection
+
+    start = time.perf_counter()
+    selection = select_model_with_gpt(task_description, model_info)
+    if cache is not None:
+        cache.put(task_description, selection, time.perf_counter() - start)
+    return selection
+
+
+def execute_task(task_type: str, prompt: str, additional_params: dict, model_info: dict, output_path: str = None):
+    """执行选定的任务（output_path 只对 TextToImage 生效，批处理时用来避免同一秒内的图片互相覆盖）"""
     
     if task_type == "NONE":
         print("ChatGPT 判断该任务无法由现有模型完成。")
@@ -151,7 +209,7 @@ def execute_task(task_type: str, prompt: str, additional_params: dict, model_inf
             
         elif task_type == "TextToImage":
             # 图片生成返回的是文件路径
-            result = text_to_image(prompt, model_name)
+            result = text_to_image(prompt, model_name, output_path)
             
         elif task_type == "FeatureExtraction":
             result = feature_extraction(prompt, model_name)
@@ -167,40 +225,120 @@ def execute_task(task_type: str, prompt: str, additional_params: dict, model_inf
         return None
 
 
-def save_result(task_type: str, user_input: str, result: any):
-    """保存结果到文件"""
+def stream_text_generation(prompt: str, model_name: str, user_input: str, write_file: bool = False):
+    """
+    流式执行文本生成：边生成边打印，最后报告首个 token 用时和总用时，返回完整文本；出错返回 None
+    write_file=True（RESULT_SINK=files）时边生成边写入结果文件（格式与 FileSink 相同，已生成的部分出错时也保留）；
+    否则只在内存里攒着，由调用方整段写进结果日志
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # 根据任务类型选择保存方式
-    if task_type == "TextToImage":
-        # 图片已经保存，result 是文件路径
-        pass      
-    elif task_type == "FeatureExtraction":
-        # 保存特征向量到文件
-        output_file = f"feature_vector_{timestamp}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "input": user_input,
-                "features": result,
-                "timestamp": timestamp
-            }, f, indent=2, ensure_ascii=False)
-        print(f"\n特征向量已保存到: {output_file}")
-        
-    else:
-        # 文本结果保存到文件
-        output_file = f"result_{task_type}_{timestamp}.txt"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"任务类型: {task_type}\n")
+    output_file = f"result_TextGeneration_{timestamp}_{new_id()[:8]}.txt" if write_file else None
+    print(f"任务类型: TextGeneration")
+    print(f"使用模型: {model_name}")
+    print(f"提示词: {prompt}")
+    print()
+
+    pieces = []
+    first_token = None
+    start = time.perf_counter()
+    f = open(output_file, 'w', encoding='utf-8') if output_file else None
+    try:
+        if f is not None:
+            f.write(f"任务类型: TextGeneration\n")
             f.write(f"用户输入: {user_input}\n")
             f.write(f"时间: {timestamp}\n")
             f.write("-" * 50 + "\n")
-            f.write(f"结果:\n{result}\n")
+            f.write("结果:\n")
+
+        for piece in textGenerationStream(prompt, model_name):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+                print("=" * 60)
+                print("执行结果:")
+                print("=" * 60)
+            pieces.append(piece)
+            print(piece, end="", flush=True)
+            if f is not None:
+                # 每段都立即写盘，中途中断也能看到已生成的内容
+                f.write(piece)
+                f.flush()
+        if f is not None:
+            f.write("\n")
+    except Exception as e:
+        print(f"\n执行任务时出错：{type(e).__name__}: {e}")
+        if output_file:
+            print(f"已生成的部分保存在: {output_file}")
+        return None
+    finally:
+        if f is not None:
+            f.close()
+
+    total = time.perf_counter() - start
+    ttft = f"{first_token:.2f}s" if first_token is not None else "无输出"
+    print(f"\n\n首个 token 用时: {ttft}，总用时: {total:.2f}s")
+    if output_file:
         print(f"结果已保存到: {output_file}")
+    return "".join(pieces).strip()
+
+
+_SINK = None
+
+
+def get_result_sink():
+    """结果存储（见 src/ResultSink.py），进程退出时自动落盘并关闭"""
+    global _SINK
+    if _SINK is None:
+        _SINK = open_sink()
+        atexit.register(_SINK.close)
+    return _SINK
+
+
+_VECTORS = None
+
+
+def get_vector_store():
+    """特征向量库（见 src/VectorStore.py）；VECTOR_STORE=0 时返回 None"""
+    global _VECTORS
+    if _VECTORS is None:
+        _VECTORS = open_vector_store()
+        if _VECTORS is not None:
+            atexit.register(_VECTORS.close)
+    return _VECTORS
+
+
+def save_result(task_type: str, user_input: str, result: any):
+    """保存结果：追加到结果日志（RESULT_SINK=files 时仍是每个任务一个文件），特征向量写进向量库"""
+    if task_type == "FeatureExtraction":
+        store = get_vector_store()
+        if store is not None:
+            vector_id = store.add(result, text=user_input)
+            print(f"特征向量已保存到向量库: {store.path}（id: {vector_id}）")
+            # 结果日志里只记录向量在库中的位置
+            result = {"vector_store": str(store.path), "vector_id": vector_id}
+    sink = get_result_sink()
+    record_id = sink.write(task_type, user_input, result)
+    if isinstance(sink, FileSink):
+        print(f"结果已保存到当前目录（id: {record_id}）")
+    else:
+        print(f"结果已保存到: {sink.path}（id: {record_id}）")
 
 
 def main():
     """主函数"""
     
+    # 批处理模式：python main.py --batch tasks.txt
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        from src.BatchRunner import batch_main
+        model_info = load_model_info()
+        # 路由和缓存都先在主线程里建好，避免多个工作线程各建一份、抢着赋值全局变量
+        get_task_router(model_info)
+        get_selection_cache()
+        batch_main(sys.argv[2:], select_model, execute_task, model_info)
+        if _CACHE is not None:
+            _CACHE.flush()
+            _CACHE.report()
+        return
+    
     # 1. 获取用户输入
     user_input = get_user_input()
     if not user_input:
@@ -212,16 +350,24 @@ def main():
     # 2. 加载模型信息
     model_info = load_model_info()
     
-    # 3. 使用 ChatGPT 选择模型并生成提示词
+    # 3. 选择模型并生成提示词（本地路由 -> 选择缓存 -> ChatGPT）
     print("正在分析任务并选择模型...")
-    selection = select_model_with_gpt(user_input, model_info)
+    selection = select_model(user_input, model_info)
     
     task_type = selection.get("task_type")
     prompt = selection.get("prompt", "")
     additional_params = selection.get("additional_params", {})
     
-    # 4. 执行任务
+    # 4. 执行任务（文本生成默认流式输出，加 --no-stream 则等全部生成完再输出）
     print("正在执行任务...\n")
+    if task_type == "TextGeneration" and "--no-stream" not in sys.argv[1:]:
+        # 只有 RESULT_SINK=files 时才边生成边写单独的文件，否则生成完整段写进结果日志，只存一份
+        to_file = isinstance(get_result_sink(), FileSink)
+        result = stream_text_generation(prompt, model_info[task_type]["model"], user_input, write_file=to_file)
+        if result is not None and not to_file:
+            save_result(task_type, user_input, result)
+        print("\n任务完成！" if result is not None else "\n任务执行失败。")
+        return
     result = execute_task(task_type, prompt, additional_params, model_info)
     
     # 5. 显示和保存结果
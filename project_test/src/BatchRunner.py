@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+批处理模式：一次处理很多个任务
+
+用法：
+    python main.py --batch tasks.txt [--output results.jsonl] [--unordered]
+                   [--limit openai=8 --limit hf-inference=4 --limit nebius=2]
+    cat tasks.txt | python main.py --batch -
+
+输入每行一个任务描述；也可以是 JSONL，每行取 task / input / query 字段。以 { 开头却解析不了的行、
+没有这些字段的 JSON 对象都记为一条失败结果，不会被悄悄跳过或当成普通任务。
+每个任务先选模型（本地路由，不确定时用 ChatGPT），再调用对应的 HuggingFace 模型。两步都是阻塞的网络调用，
+这里用 asyncio 把它们放到线程池里并发执行，并按服务商分别限流：
+    openai        选模型（ChatGPT）
+    hf-inference  文本生成、摘要、问答、翻译、特征提取
+    nebius        文生图
+输入是边读边提交的，同时在途的任务数不超过 --max-in-flight，所以很长的任务流也不会一次性读进内存。
+
+结果按 JSONL 写到 --output（默认 batch_results_时间戳.jsonl），每行一个任务：
+    {"index": 0, "task": "...", "task_type": "...", "result": ..., "elapsed_s": 1.23}
+失败的任务带 "error" 字段而不是 "result"。特征向量等大的数值结果写进同名的 .bin 文件，
+"result" 里只记录 {"blob": {"offset", "nbytes", "dtype", "shape"}}，可用 ResultSink.BinaryStore.get 读回；
+加 --vectors DIR 时特征向量改为写进向量库，"result" 里记录 {"vector_store", "vector_id"}。
+默认按输入顺序输出，--unordered 则谁先完成先写谁。
+进度和吞吐量定期打印到 stderr。各个任务执行时的日志（选模型、调用模型的 print）也转到 stderr，
+stdout 只输出最后的结果文件路径。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from src.ResultSink import BinaryStore, encode_result, sink_blob_paths
+from src.VectorStore import VectorStore
+
+# 每种任务实际调用的推理服务商（与 src/ 下各 handler 里 inference_client 的 provider 保持一致）
+TASK_PROVIDERS = {"TextToImage": "nebius"}
+DEFAULT_TASK_PROVIDER = "hf-inference"
+
+# 各服务商默认的最大并发数
+DEFAULT_LIMITS = {"openai": 8, "hf-inference": 4, "nebius": 2}
+
+
+class InvalidTask:
+    """读不出任务描述的输入行，run_one 直接把它记为失败"""
+
+    def __init__(self, line: str, reason: str):
+        self.line = line
+        self.reason = reason
+
+
+def iter_tasks(path: str):
+    """逐行读取任务；path 为 - 时从 stdin 读。JSON 解析失败或对象里没有任务描述时产出 InvalidTask"""
+    f = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield InvalidTask(line, f"JSON 解析失败: {e}")
+                    continue
+                if isinstance(item, dict):
+                    task = str(item.get("task") or item.get("input") or item.get("query") or "").strip()
+                    if not task:
+                        yield InvalidTask(line, "JSON 行里没有 task / input / query 字段")
+                        continue
+                    line = task
+            yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class Progress:
+    """统计完成数、失败数和吞吐量，每隔 interval 秒打印一次到 stderr"""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.submitted = 0
+        self.done = 0
+        self.failed = 0
+
+    def update(self, ok: bool):
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        label = "[批处理完成]" if final else "[批处理进度]"
+        print(
+            f"{label} 已完成 {self.done}/{self.submitted}，失败 {self.failed}，"
+            f"用时 {elapsed:.1f}s，吞吐 {rate:.2f} 任务/秒",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+async def run_one(index: int, task: str, select_fn, execute_fn, model_info: dict, limits: dict, image_prefix: str, blobs=None, vectors=None):
+    """处理一个任务：选模型 -> 执行，两步分别受对应服务商的并发限制"""
+    if isinstance(task, InvalidTask):
+        return {"index": index, "task": task.line, "error": task.reason, "elapsed_s": 0.0}
+    start = time.perf_counter()
+    record = {"index": index, "task": task}
+    try:
+        async with limits["openai"]:
+            selection = await asyncio.to_thread(select_fn, task, model_info)
+
+        task_type = selection.get("task_type")
+        record["task_type"] = task_type
+        if task_type == "NONE" or task_type not in model_info:
+            record["error"] = "没有合适的模型"
+        else:
+            provider = TASK_PROVIDERS.get(task_type, DEFAULT_TASK_PROVIDER)
+            # 并发生成图片时按序号命名，避免同一秒内的文件互相覆盖
+            image_path = f"{image_prefix}_{index}.png" if task_type == "TextToImage" else None
+            async with limits[provider]:
+                result = await asyncio.to_thread(
+                    execute_fn,
+                    task_type,
+                    selection.get("prompt", ""),
+                    selection.get("additional_params", {}),
+                    model_info,
+                    image_path,
+                )
+            if result is None:
+                record["error"] = "任务执行失败"
+            elif vectors is not None and task_type == "FeatureExtraction":
+                vector_id = await asyncio.to_thread(vectors.add, result, task)
+                record["result"] = {"vector_store": str(vectors.path), "vector_id": vector_id}
+            else:
+                record["result"] = encode_result(result, blobs)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run_batch(
+    tasks,
+    select_fn,
+    execute_fn,
+    model_info: dict,
+    output,
+    limits: dict = None,
+    ordered: bool = True,
+    max_in_flight: int = None,
+    progress_interval: float = 2.0,
+    blobs: BinaryStore = None,
+    vectors=None,
+):
+    """
+    并发处理 tasks（任意可迭代的任务描述），结果逐行写入 output（文本文件对象）
+
+    blobs 不为空时，特征向量等大的数值结果写进这个二进制文件，JSONL 里只记录位置；
+    vectors（VectorStore）不为空时，特征提取的结果改为写进向量库，JSONL 里记录向量 id。
+    ordered=True 时按输入顺序写出：已完成但还没轮到的结果先缓存，它们也计入在途数量，
+    所以慢任务卡住队头时不会无限读入新任务。
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    semaphores = {name: asyncio.Semaphore(n) for name, n in limits.items()}
+    workers = sum(limits.values())
+    max_in_flight = max_in_flight or 2 * workers
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    loop.set_default_executor(executor)
+    # 读输入单独用一个线程：stdin 上阻塞的读不会占掉 select_fn / execute_fn 的工作线程
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-reader")
+
+    progress = Progress(progress_interval)
+    image_prefix = f"generated_image_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    pending = set()
+    buffered = {}
+    next_index = 0
+    source = iter(tasks)
+
+    def emit(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    def collect(done):
+        nonlocal next_index
+        for fut in done:
+            record = fut.result()
+            progress.update("error" not in record)
+            if not ordered:
+                emit(record)
+                continue
+            buffered[record["index"]] = record
+            while next_index in buffered:
+                emit(buffered.pop(next_index))
+                next_index += 1
+
+    try:
+        index = 0
+        while True:
+            # stdin 读取可能阻塞，放到读线程里，不卡住事件循环
+            task = await loop.run_in_executor(reader, next, source, None)
+            if task is None:
+                break
+            pending.add(asyncio.ensure_future(
+                run_one(index, task, select_fn, execute_fn, model_info, semaphores, image_prefix, blobs, vectors)
+            ))
+            index += 1
+            progress.submitted = index
+            while len(pending) + len(buffered) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            collect(done)
+    finally:
+        reader.shutdown(wait=False)
+        executor.shutdown(wait=False)
+
+    progress.report(final=True)
+    return progress
+
+
+def _parse_limit(spec: str):
+    name, sep, value = spec.partition("=")
+    if not sep or not value.isdigit() or int(value) <= 0:
+        raise argparse.ArgumentTypeError(f"并发限制格式应为 服务商=正整数，例如 openai=8，收到: {spec}")
+    return name, int(value)
+
+
+def batch_main(argv, select_fn, execute_fn, model_info: dict):
+    """解析批处理参数并运行"""
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="批量执行任务")
+    parser.add_argument("source", help="任务文件，每行一个任务；- 表示从 stdin 读取")
+    parser.add_argument("--output", help="结果 JSONL 文件（默认 batch_results_时间戳.jsonl）")
+    parser.add_argument("--unordered", action="store_true", help="按完成顺序输出，而不是输入顺序")
+    parser.add_argument("--limit", type=_parse_limit, action="append", default=[],
+                        help="服务商并发限制，如 openai=8、hf-inference=4、nebius=2，可重复")
+    parser.add_argument("--max-in-flight", type=int, help="同时在途的最大任务数（默认为并发总数的 2 倍）")
+    parser.add_argument("--vectors", help="把特征提取的结果写进这个目录下的向量库（见 src/VectorStore.py）")
+    parser.add_argument("--progress-interval", type=float, default=2.0, help="进度打印间隔（秒）")
+    args = parser.parse_args(argv)
+
+    output_path = args.output or f"batch_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    # 特征向量等大数组写到同名的 .bin 文件；结果文件是覆盖写的，.bin 也先清空。
+    # 交互模式的结果日志（results.jsonl 等）引用着它自己的 .bin，清空会让那些记录读不回来，所以直接拒绝
+    blob_path = Path(output_path).with_suffix(".bin")
+    if blob_path.resolve() in sink_blob_paths():
+        parser.error(f"{blob_path} 是交互模式结果日志的数据文件，请用别的 --output")
+    open(blob_path, 'wb').close()
+    blobs = BinaryStore(blob_path)
+    vectors = VectorStore(args.vectors) if args.vectors else None
+    # 各任务的 print 会在 stdout 上交错，批处理时统一转到 stderr
+    with open(output_path, 'w', encoding='utf-8') as output, contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(run_batch(
+            iter_tasks(args.source),
+            select_fn,
+            execute_fn,
+            model_info,
+            output,
+            limits=dict(args.limit),
+            ordered=not args.unordered,
+            max_in_flight=args.max_in_flight,
+            progress_interval=args.progress_interval,
+            blobs=blobs,
+            vectors=vectors,
+        ))
+    blobs.close()
+    if vectors is not None:
+        vectors.close()
+    print(f"批处理结果已保存到: {output_path}")
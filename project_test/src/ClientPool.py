@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+共享的推理客户端注册表
+
+所有 handler 不再每次调用都新建 InferenceClient，而是通过 inference_client(provider, timeout)
+取得按 (provider, timeout) 缓存的同一个客户端。底层 HTTP 连接池由 huggingface_hub 的全局 session
+提供，这里统一配置连接池上限、keep-alive 时间，以及在安装了 h2 时启用 HTTP/2，
+因此 TCP/TLS 连接可以跨调用、跨线程复用。
+
+可用环境变量调整：
+    HF_HTTP_MAX_CONNECTIONS   连接池最大连接数（默认 100）
+    HF_HTTP_MAX_KEEPALIVE     最多保留的空闲 keep-alive 连接（默认 20）
+    HF_HTTP_KEEPALIVE_EXPIRY  空闲连接保留秒数（默认 30）
+    HF_HTTP2                  1/0 强制开启/关闭 HTTP/2（默认：安装了 h2 就开启）
+
+测试时不需要真实服务：hf-inference 的 model 参数可以直接是 URL，
+例如 summarization(text, model="http://127.0.0.1:8000/summarize")，请求会发到本地的替身 HTTP 服务。
+"""
+
+import os
+import sys
+import threading
+from contextlib import ExitStack, contextmanager
+
+from huggingface_hub import InferenceClient
+
+# 所有 handler 都经由这里取客户端，token 在这里统一检查
+if not os.getenv("HUGGINGFACE_TOKEN"):
+    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
+    sys.exit(1)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name, "").strip()
+    return int(value) if value else default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+_HTTP2_ENV = os.getenv("HF_HTTP2", "").strip()
+
+# 连接池配置
+POOL_CONFIG = {
+    "max_connections": _env_int("HF_HTTP_MAX_CONNECTIONS", 100),
+    "max_keepalive_connections": _env_int("HF_HTTP_MAX_KEEPALIVE", 20),
+    "keepalive_expiry": float(_env_int("HF_HTTP_KEEPALIVE_EXPIRY", 30)),
+    "http2": _HTTP2_ENV == "1" if _HTTP2_ENV else _http2_available(),
+}
+
+_LOCK = threading.Lock()
+_INFERENCE_CLIENTS = {}
+_HTTP_CLIENTS = {}
+_SESSION_CONFIGURED = False
+
+
+def _httpx_module():
+    """huggingface_hub 2.x 使用 httpx2，1.x 使用 httpx；返回它实际使用的那个模块"""
+    from huggingface_hub.utils import _http
+
+    return getattr(_http, "httpx2", None) or getattr(_http, "httpx", None)
+
+
+def _make_httpx_client(httpx_mod, timeout=None, event_hooks=None):
+    limits = httpx_mod.Limits(
+        max_connections=POOL_CONFIG["max_connections"],
+        max_keepalive_connections=POOL_CONFIG["max_keepalive_connections"],
+        keepalive_expiry=POOL_CONFIG["keepalive_expiry"],
+    )
+    kwargs = {"limits": limits, "timeout": timeout, "follow_redirects": True}
+    if event_hooks:
+        kwargs["event_hooks"] = event_hooks
+    try:
+        return httpx_mod.Client(http2=POOL_CONFIG["http2"], **kwargs)
+    except ImportError:
+        # 没装 h2 时 http2=True 会报错，退回 HTTP/1.1 keep-alive
+        return httpx_mod.Client(**kwargs)
+
+
+def _configure_hub_session():
+    """让 huggingface_hub 的全局 session 使用我们的连接池配置（只做一次）"""
+    global _SESSION_CONFIGURED
+    if _SESSION_CONFIGURED:
+        return
+
+    import huggingface_hub
+    from huggingface_hub.utils import _http  # 复用 hub 自带的请求钩子（离线模式检查、请求 ID 等）
+
+    if hasattr(huggingface_hub, "set_client_factory"):
+        # huggingface_hub >= 1.0：所有请求共用一个 httpx 客户端
+        httpx_mod = _httpx_module()
+        hook = getattr(_http, "hf_request_event_hook", None)
+        hooks = {"request": [hook]} if hook else None
+        huggingface_hub.set_client_factory(lambda: _make_httpx_client(httpx_mod, event_hooks=hooks))
+    elif hasattr(huggingface_hub, "configure_http_backend"):
+        # 旧版本基于 requests：每个线程一个 Session，这里只能调整连接池大小（不支持 HTTP/2）
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        def backend_factory():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONFIG["max_keepalive_connections"],
+                pool_maxsize=POOL_CONFIG["max_connections"],
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+
+        huggingface_hub.configure_http_backend(backend_factory=backend_factory)
+    _SESSION_CONFIGURED = True
+
+
+class _ThreadLocalExitStack(threading.local):
+    """
+    InferenceClient 会把每个响应登记到 self.exit_stack 上，直到 close() 才释放。
+    客户端被多个线程共享时，改成每个线程各自一份，互不关闭对方的请求。
+    """
+
+    def __init__(self):
+        self.stack = ExitStack()
+
+    def enter_context(self, cm):
+        return self.stack.enter_context(cm)
+
+    def close(self):
+        self.stack.close()
+        self.stack = ExitStack()
+
+
+def get_inference_client(provider: str = "hf-inference", timeout: float = 30):
+    """按 (provider, timeout) 返回共享的 InferenceClient"""
+    key = (provider, timeout)
+    client = _INFERENCE_CLIENTS.get(key)
+    if client is not None:
+        return client
+
+    with _LOCK:
+        client = _INFERENCE_CLIENTS.get(key)
+        if client is None:
+            _configure_hub_session()
+            client = InferenceClient(
+                provider=provider,
+                api_key=os.getenv("HUGGINGFACE_TOKEN"),
+                timeout=timeout,
+            )
+            if hasattr(client, "exit_stack"):
+                client.exit_stack = _ThreadLocalExitStack()
+            _INFERENCE_CLIENTS[key] = client
+        return client
+
+
+@contextmanager
+def inference_client(provider: str = "hf-inference", timeout: float = 30):
+    """
+    用法：
+        with inference_client("hf-inference", 30) as client:
+            client.summarization(...)
+    退出时只释放当前线程这次调用登记的响应，连接回到连接池继续复用。
+    """
+    client = get_inference_client(provider, timeout)
+    try:
+        yield client
+    finally:
+        stack = getattr(client, "exit_stack", None)
+        if stack is not None:
+            stack.close()
+
+
+def get_http_client(timeout: float = 30.0):
+    """按 timeout 返回共享的 httpx.Client（给 OpenAI 客户端等直接用 httpx 的地方）"""
+    client = _HTTP_CLIENTS.get(timeout)
+    if client is not None:
+        return client
+
+    import httpx
+
+    with _LOCK:
+        client = _HTTP_CLIENTS.get(timeout)
+        if client is None:
+            client = _make_httpx_client(httpx, timeout=timeout)
+            _HTTP_CLIENTS[timeout] = client
+        return client
+
+
+def close_all():
+    """关闭所有共享客户端（一般只在进程退出或测试时调用）"""
+    with _LOCK:
+        for client in _HTTP_CLIENTS.values():
+            client.close()
+        _HTTP_CLIENTS.clear()
+        _INFERENCE_CLIENTS.clear()
@@ -2,13 +2,12 @@
 
 import os
 import sys
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def feature_extraction(text: str, model: str = "facebook/bart-base"):
@@ -28,19 +27,15 @@ def feature_extraction(text: str, model: str = "facebook/bart-base"):
     返回:
         文本的向量表示（numpy array 或 list）
     """
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=token,
-        timeout=30,
-    )
     
     print(f"调用模型: {model}")
     print(f"输入文本: {text[:100]}...")  # 只显示前100个字符
     
-    result = client.feature_extraction(
-        text,
-        model=model,
-    )
+    with inference_client("hf-inference", 30) as client:
+        result = client.feature_extraction(
+            text,
+            model=model,
+        )
     
     # result 是一个向量（embedding）
     # 通常是多维数组，表示文本的语义特征
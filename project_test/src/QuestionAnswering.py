@@ -2,13 +2,12 @@
 
 import os
 import sys
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def question_answering(question: str, context: str, model: str = "deepset/roberta-base-squad2"):
@@ -28,20 +27,16 @@ def question_answering(question: str, context: str, model: str = "deepset/robert
     返回:
         答案文本
     """
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=token,
-        timeout=30,
-    )
     
     print(f"调用模型: {model}")
     #print(f"问题: {question}")
     
-    result = client.question_answering(
-        question=question,
-        context=context,
-        model=model,
-    )
+    with inference_client("hf-inference", 30) as client:
+        result = client.question_answering(
+            question=question,
+            context=context,
+            model=model,
+        )
     
     # result 包含答案和置信度分数
     if hasattr(result, 'answer'):
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+结果存储（sink）
+
+以前 save_result 每个任务写一个按秒命名的文件，同一秒的两个任务会互相覆盖，
+特征向量还用 indent=2 的 JSON 保存，批量跑时又慢又占地方。现在统一写到一个只追加的日志里：
+
+    jsonl   每条结果一行紧凑 JSON（默认，文件 results.jsonl）
+    sqlite  SQLite 表 results（文件 results.sqlite）
+    files   旧的每任务一个文件，文件名加上 id 避免覆盖
+
+每条结果都有唯一 id。写入先进缓冲区，每 fsync_every 条或每 fsync_interval 秒才 fsync / commit 一次。
+元素个数超过 LARGE_ARRAY 的数值结果（特征向量）不写进日志，而是追加到旁边的二进制文件
+（results.bin），日志里只记录 {"blob": {"offset", "nbytes", "dtype", "shape"}}，读回时是零拷贝的 numpy 数组。
+
+可用环境变量选择：
+    RESULT_SINK         jsonl / sqlite / files（默认 jsonl）
+    RESULT_SINK_PATH    日志文件路径（默认 results.jsonl 或 results.sqlite）
+"""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+SINKS = ("jsonl", "sqlite", "files")
+
+# 元素个数超过它的数值数组放进二进制旁路文件
+LARGE_ARRAY = 64
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def to_jsonable(value):
+    """把结果转成可以写进 JSON 的形式（特征向量可能是 numpy 数组）"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    return str(value)
+
+
+def _numeric_array(value):
+    """value 是（可嵌套的）数值数组时返回 numpy 数组，否则返回 None"""
+    if isinstance(value, np.ndarray):
+        arr = value
+    elif isinstance(value, (list, tuple)) and value:
+        try:
+            arr = np.asarray(value)
+        except ValueError:  # 长短不一的嵌套列表
+            return None
+    else:
+        return None
+    return arr if arr.dtype.kind in "fiub" else None
+
+
+class BinaryStore:
+    """
+    只追加的二进制文件：数组原样写入，返回它的位置信息
+    不经过 Python 的写缓冲，每个数组一次 O_APPEND 写入，写完后的文件位置减去长度就是它的偏移，
+    所以多个进程同时追加同一个文件时偏移也是对的。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._f = open(self.path, 'ab', buffering=0)
+        self._lock = threading.Lock()
+
+    def put(self, array) -> dict:
+        arr = np.ascontiguousarray(array)
+        data = arr.tobytes()
+        with self._lock:
+            self._f.write(data)
+            offset = self._f.tell() - len(data)
+        return {"offset": offset, "nbytes": arr.nbytes, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+    def get(self, ref: dict) -> np.ndarray:
+        """按位置信息读回数组（内存映射，不复制数据）"""
+        dtype = np.dtype(ref["dtype"])
+        count = ref["nbytes"] // dtype.itemsize
+        if count == 0:
+            return np.zeros(ref["shape"], dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=ref["offset"], shape=(count,)).reshape(ref["shape"])
+
+    def flush(self):
+        with self._lock:
+            if not self._f.closed:
+                os.fsync(self._f.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                os.fsync(self._f.fileno())
+                self._f.close()
+
+
+def encode_result(result, blobs: BinaryStore = None):
+    """结果 -> 可写进日志的值；大的数值数组放进 blobs，只返回引用"""
+    if blobs is not None:
+        arr = _numeric_array(result)
+        if arr is not None and arr.size > LARGE_ARRAY:
+            return {"blob": blobs.put(arr)}
+    return to_jsonable(result)
+
+
+def decode_result(value, blobs: BinaryStore = None):
+    if blobs is not None and isinstance(value, dict) and set(value) == {"blob"}:
+        return blobs.get(value["blob"])
+    return value
+
+
+class _BufferedSink(abc.ABC):
+    """按条数 / 时间批量落盘的公共逻辑；子类实现 _append 和 _commit"""
+
+    def __init__(self, path, fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.blobs = BinaryStore(self.path.with_suffix(".bin"))
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _record(self, task_type: str, user_input: str, result) -> dict:
+        return {
+            "id": new_id(),
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "task_type": task_type,
+            "input": user_input,
+            "result": encode_result(result, self.blobs),
+        }
+
+    @abc.abstractmethod
+    def _append(self, record: dict):
+        """把一条记录放进缓冲区（调用时已持有 self._lock）"""
+
+    @abc.abstractmethod
+    def _commit(self):
+        """把缓冲区里的记录落盘"""
+
+    def write(self, task_type: str, user_input: str, result) -> str:
+        """追加一条结果，返回它的 id"""
+        record = self._record(task_type, user_input, result)
+        with self._lock:
+            self._append(record)
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+        return record["id"]
+
+    def _sync(self):
+        # 先落盘二进制数据，保证已落盘的日志引用的数据一定存在
+        self.blobs.flush()
+        self._commit()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+
+class JsonlSink(_BufferedSink):
+    """只追加的 JSONL 日志"""
+
+    def __init__(self, path="results.jsonl", fsync_every: int = 32, fsync_interval: float = 1.0):
+        super().__init__(path, fsync_every, fsync_interval)
+        self._f = open(self.path, 'a', encoding='utf-8')
+
+    def _append(self, record: dict):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _commit(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def records(self):
+        """按写入顺序读出所有结果（大数组读回为 numpy 数组）"""
+        self.flush()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    record["result"] = decode_result(record["result"], self.blobs)
+                    yield record
+
+    def close(self):
+        with self._lock:
+            if not self._f.closed:
+                self._sync()
+                self._f.close()
+            self.blobs.close()
+
+
+class SqliteSink(_BufferedSink):
+    """SQLite 日志：每批结果一个事务"""
+
+    def __init__(self, path="results.sqlite", fsync_every: int = 32, fsync_interval: float = 1.0):
+        super().__init__(path, fsync_every, fsync_interval)
+        # 批处理时多个线程共用一个连接，由 self._lock 串行化
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level="DEFERRED")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "id TEXT PRIMARY KEY, time TEXT, task_type TEXT, input TEXT, result TEXT)"
+        )
+        self._conn.commit()
+
+    def _append(self, record: dict):
+        self._conn.execute(
+            "INSERT INTO results (id, time, task_type, input, result) VALUES (?, ?, ?, ?, ?)",
+            (record["id"], record["time"], record["task_type"], record["input"],
+             json.dumps(record["result"], ensure_ascii=False, separators=(",", ":"))),
+        )
+
+    def _commit(self):
+        self._conn.commit()
+
+    def records(self):
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT id, time, task_type, input, result FROM results ORDER BY rowid").fetchall()
+        for id_, time_, task_type, user_input, result in rows:
+            yield {
+                "id": id_,
+                "time": time_,
+                "task_type": task_type,
+                "input": user_input,
+                "result": decode_result(json.loads(result), self.blobs),
+            }
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._conn.close()
+            self.blobs.close()
+
+
+class FileSink:
+    """旧格式：每个任务一个文件，文件名带 id，同一秒内的任务不会互相覆盖"""
+
+    def __init__(self, path="."):
+        self.path = Path(path)
+
+    def write(self, task_type: str, user_input: str, result) -> str:
+        record_id = new_id()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = f"{timestamp}_{record_id[:8]}"
+        if task_type == "TextToImage":
+            # 图片已经保存，result 是文件路径
+            return record_id
+        if task_type == "FeatureExtraction":
+            output_file = self.path / f"feature_vector_{suffix}.json"
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump({"id": record_id, "input": user_input, "features": to_jsonable(result), "timestamp": timestamp}, f, ensure_ascii=False)
+        else:
+            output_file = self.path / f"result_{task_type}_{suffix}.txt"
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(f"任务类型: {task_type}\n")
+                f.write(f"用户输入: {user_input}\n")
+                f.write(f"时间: {timestamp}\n")
+                f.write("-" * 50 + "\n")
+                f.write(f"结果:\n{result}\n")
+        return record_id
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def sink_blob_paths():
+    """交互模式的结果日志会用到的 .bin 文件（默认路径和 RESULT_SINK_PATH 指定的路径），已解析为绝对路径"""
+    paths = ["results.jsonl", "results.sqlite"]
+    kind = os.getenv("RESULT_SINK", "jsonl").strip().lower()
+    env_path = os.getenv("RESULT_SINK_PATH", "").strip()
+    if env_path and kind in ("jsonl", "sqlite"):
+        paths.append(env_path)
+    return {Path(p).with_suffix(".bin").resolve() for p in paths}
+
+
+def open_sink(kind: str = None, path: str = None):
+    """按类型打开结果存储；参数为空时读环境变量 RESULT_SINK / RESULT_SINK_PATH"""
+    kind = (kind or os.getenv("RESULT_SINK", "jsonl")).strip().lower()
+    path = path or os.getenv("RESULT_SINK_PATH", "").strip() or None
+    if kind == "jsonl":
+        return JsonlSink(path or "results.jsonl")
+    if kind == "sqlite":
+        return SqliteSink(path or "results.sqlite")
+    if kind == "files":
+        return FileSink(path or ".")
+    raise ValueError(f"未知的结果存储类型: {kind}（可选 {', '.join(SINKS)}）")
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+ChatGPT 选模型结果的缓存
+
+很多任务只是待处理的文本不同，指令完全一样（"Translate this to Chinese: ……"），
+没必要每次都问一遍 ChatGPT。这里把 ChatGPT 的选择结果按任务文本缓存下来：
+
+    完全命中   指令部分（忽略大小写和多余空白）和待处理文本（逐字比较）都和缓存里的一样，
+               直接返回缓存的结果。待处理文本只要有一点不同（包括大小写）就不算完全命中。
+    相似命中   指令部分（冒号 / 引号之前的内容，见 TaskRouter.split_payload）的向量
+               和缓存里某条的余弦相似度 >= threshold，复用它的 task_type 和 additional_params。
+
+相似命中时绝不复用缓存里的 prompt：摘要、翻译的 prompt 换成这次任务自己的待处理文本，
+文本生成、文生图、特征提取的 prompt 换成这次任务的整句（指令本身就是提示词的一部分）。
+问答的 question/context 来自正文，所以问答只允许完全命中；翻译的源语言按新文本重新判断。
+
+缓存条数有上限（LRU 淘汰）、有过期时间（TTL），并保存到 JSON 文件，下次运行继续使用。
+写入不会每次都重写文件：攒够 save_every 条新结果或距上次保存超过 save_interval 秒才保存一次，
+退出前（或批处理结束时）调用 flush() 把剩下的写回去。
+可用环境变量调整：
+    SELECTION_CACHE=0            关闭缓存
+    SELECTION_CACHE_PATH         缓存文件（默认 project_test/.selection_cache.json）
+    SELECTION_CACHE_SIZE         最多缓存条数（默认 1000）
+    SELECTION_CACHE_TTL          过期秒数（默认 7 天）
+    SELECTION_CACHE_THRESHOLD    相似命中阈值（默认 0.9）
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.TaskRouter import detect_language, mentioned_languages, split_payload, text_features
+
+DEFAULT_PATH = Path(__file__).parent.parent / ".selection_cache.json"
+DEFAULT_SIZE = 1000
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_SAVE_EVERY = 32
+DEFAULT_SAVE_INTERVAL = 30.0
+
+# 这几种任务的 prompt 总是整句任务（指令也是提示词的一部分），相似命中时直接用新任务当 prompt
+WHOLE_TASK_PROMPT = ("TextGeneration", "TextToImage", "FeatureExtraction")
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _key(task: str) -> str:
+    """完全命中用的键：指令部分规范化，待处理文本原样保留（缓存的 prompt 就是它）"""
+    instruction, payload = split_payload(task)
+    if payload is None:
+        # 整句任务就是 prompt，只合并空白，不改大小写
+        return re.sub(r"\s+", " ", task).strip()
+    return f"{_normalize(instruction)}\n{payload}"
+
+
+def _unit(feats: dict) -> dict:
+    norm = sum(w * w for w in feats.values()) ** 0.5
+    return {idx: w / norm for idx, w in feats.items()} if norm > 0 else {}
+
+
+class SelectionCache:
+    """LRU + TTL 的选择结果缓存，线程安全"""
+
+    def __init__(
+        self,
+        path=DEFAULT_PATH,
+        max_entries: int = DEFAULT_SIZE,
+        ttl: float = DEFAULT_TTL,
+        threshold: float = DEFAULT_THRESHOLD,
+        save_every: int = DEFAULT_SAVE_EVERY,
+        save_interval: float = DEFAULT_SAVE_INTERVAL,
+    ):
+        self.path = Path(path) if path else None
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()  # _key(任务文本) -> 条目，越靠后越近使用
+        self._postings = {}  # 特征下标 -> {任务文本: 权重}，相似查找时只看有共同特征的条目
+        self._lock = threading.Lock()
+        self._unsaved = 0  # 上次保存之后新写入的条数
+        self._last_save = time.monotonic()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.llm_seconds = 0.0  # 本次运行中 ChatGPT 调用的总耗时
+        self.llm_calls = 0
+        self.saved_seconds = 0.0  # 命中条目当初调用 ChatGPT 花的时间之和
+
+    @classmethod
+    def from_env(cls):
+        cache = cls(
+            path=os.getenv("SELECTION_CACHE_PATH") or DEFAULT_PATH,
+            max_entries=int(os.getenv("SELECTION_CACHE_SIZE", DEFAULT_SIZE)),
+            ttl=float(os.getenv("SELECTION_CACHE_TTL", DEFAULT_TTL)),
+            threshold=float(os.getenv("SELECTION_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+        )
+        cache.load()
+        return cache
+
+    # ---------- 内部索引 ----------
+
+    def _index(self, key: str, entry: dict):
+        entry["vector"] = _unit(text_features(entry["instruction"]))
+        for idx, w in entry["vector"].items():
+            self._postings.setdefault(idx, {})[key] = w
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        for idx in entry["vector"]:
+            bucket = self._postings.get(idx)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._postings[idx]
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl > 0 and now - entry["created"] > self.ttl
+
+    def _most_similar(self, vector: dict, instruction: str, has_payload: bool, now: float):
+        scores = {}
+        for idx, w in vector.items():
+            for key, wk in self._postings.get(idx, {}).items():
+                scores[key] = scores.get(key, 0.0) + w * wk
+        best_key, best_score = None, self.threshold
+        languages = mentioned_languages(instruction)
+        for key, score in scores.items():
+            entry = self._entries[key]
+            if score < best_score or entry["has_payload"] != has_payload or self._expired(entry, now):
+                continue
+            # "to French" 和 "to German" 的指令向量可能很接近，提到的语言必须完全一致
+            if mentioned_languages(entry["instruction"]) != languages:
+                continue
+            best_key, best_score = key, score
+        return best_key, best_score
+
+    # ---------- 查询 / 写入 ----------
+
+    def get(self, task: str):
+        """命中时返回选择结果（带 "cache" 字段说明命中类型），否则返回 None"""
+        key = _key(task)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                self.saved_seconds += entry.get("llm_seconds") or 0.0
+                return {**json.loads(json.dumps(entry["selection"])), "cache": "exact"}
+
+            instruction, payload = split_payload(task)
+            vector = _unit(text_features(instruction))
+            match_key, score = self._most_similar(vector, instruction, payload is not None, now) if vector else (None, 0.0)
+            selection = self._adapt(self._entries[match_key], task, payload) if match_key else None
+            if selection is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(match_key)
+            self.similar_hits += 1
+            self.saved_seconds += self._entries[match_key].get("llm_seconds") or 0.0
+            selection["cache"] = f"similar:{score:.2f}"
+            return selection
+
+    def _adapt(self, entry: dict, task: str, payload):
+        """把缓存的选择套用到新任务上：task_type / 参数可以复用，prompt 必须来自新任务"""
+        cached = entry["selection"]
+        task_type = cached["task_type"]
+        params = dict(cached.get("additional_params") or {})
+        if task_type == "QuestionAnswering":
+            return None
+        if task_type in WHOLE_TASK_PROMPT:
+            # "Write a short poem based on this: winter snow" 只给 "winter snow" 模型就不知道要写诗
+            prompt = task.strip()
+        elif payload is None:
+            return None
+        else:
+            prompt = payload
+        if task_type == "Translation":
+            if "tgt_lang" not in params:
+                return None
+            if entry.get("payload_lang") != detect_language(payload):
+                params["src_lang"] = detect_language(payload)
+        return {"task_type": task_type, "prompt": prompt, "additional_params": params}
+
+    def put(self, task: str, selection: dict, llm_seconds: float = None):
+        """记录一次 ChatGPT 的选择结果；NONE（可能是调用出错）不缓存"""
+        if llm_seconds is not None:
+            with self._lock:
+                self.llm_seconds += llm_seconds
+                self.llm_calls += 1
+        if not selection or selection.get("task_type") in (None, "NONE"):
+            return
+        key = _key(task)
+        instruction, payload = split_payload(task)
+        entry = {
+            "task": task,
+            "instruction": _normalize(instruction),
+            "has_payload": payload is not None,
+            "payload_lang": detect_language(payload) if payload else None,
+            "selection": {
+                "task_type": selection["task_type"],
+                "prompt": selection.get("prompt", ""),
+                "additional_params": selection.get("additional_params") or {},
+            },
+            "created": time.time(),
+            "llm_seconds": llm_seconds,
+        }
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._index(key, entry)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+
+    # ---------- 持久化 ----------
+
+    def load(self):
+        """读取缓存文件，丢掉已过期的条目；文件损坏时当作空缓存"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"读取选择缓存失败，忽略: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            # 文件里按使用先后保存，最后的最近使用
+            for entry in items[-self.max_entries:]:
+                if self._expired(entry, now):
+                    continue
+                key = _key(entry["task"])
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = entry
+                self._index(key, entry)
+
+    def save(self):
+        """原子地写回缓存文件（先写临时文件再替换）"""
+        if self.path is None:
+            return
+        with self._lock:
+            items = [{k: v for k, v in entry.items() if k != "vector"} for entry in self._entries.values()]
+            self._unsaved = 0
+            self._last_save = time.monotonic()
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"保存选择缓存失败: {e}")
+
+    def flush(self):
+        """有未保存的条目时写回缓存文件"""
+        with self._lock:
+            dirty = self._unsaved > 0
+        if dirty:
+            self.save()
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            hits = self.exact_hits + self.similar_hits
+            return {
+                "entries": len(self._entries),
+                "lookups": lookups,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "llm_calls": self.llm_calls,
+                "llm_seconds": self.llm_seconds,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    def report(self):
+        s = self.stats()
+        if not s["lookups"]:
+            return
+        print(
+            f"[选择缓存] 查询 {s['lookups']} 次，命中率 {s['hit_rate']:.1%}"
+            f"（完全 {s['exact_hits']}，相似 {s['similar_hits']}），缓存 {s['entries']} 条，"
+            f"约节省 ChatGPT 时间 {s['saved_seconds']:.2f}s"
+        )
@@ -2,13 +2,12 @@
 
 import os
 import sys
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def summarization(text: str, model: str = "Falconsai/medical_summarization"):
@@ -22,18 +21,13 @@ def summarization(text: str, model: str = "Falconsai/medical_summarization"):
         摘要文本
     """
     
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=token,
-        timeout=30,
-    )
-    
     print(f"调用模型: {model}")
     
-    result = client.summarization(
-        text,
-        model=model,
-    )
+    with inference_client("hf-inference", 30) as client:
+        result = client.summarization(
+            text,
+            model=model,
+        )
     
     # result 是一个包含摘要的对象
     summary = result.summary_text if hasattr(result, 'summary_text') else str(result)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+本地任务路由：不调用 ChatGPT，直接在本地判断任务类型
+
+做法：
+    1. 把 info.json 里每种任务的 description、use_cases、examples（再加上下面的中文提示语）
+       分别转成向量，每种任务取平均得到一个"质心"。这一步只在第一次使用时做一次。
+    2. 新任务转成同样的向量，和 6 个质心算余弦相似度，最高的就是候选任务类型。
+    3. 最高分低于 threshold，或者和第二名的差距小于 margin，就认为不确定，交给 ChatGPT。
+       有待处理文本时按指令部分分类，整句在该类型上的得分还要不低于 full_threshold，
+       防止"画一张我银行余额的图"这类指令像、整体不像的任务被误判。
+    4. 任务类型确定后，还要从任务描述里取出真正要处理的文本（冒号或引号后面的内容）和参数
+       （翻译的语言、问答的 question/context）。取不出来时同样交给 ChatGPT。
+
+向量是本地算的哈希特征（英文单词、相邻词对、中文单字和相邻两字），不需要网络和模型文件，
+一次路由只需要几十微秒。
+
+阈值可用环境变量调整：TASK_ROUTER_THRESHOLD（默认 0.25）、TASK_ROUTER_FULL_THRESHOLD（默认 0.1）、
+TASK_ROUTER_MARGIN（默认 0.05）。默认值按 info.json 的 examples 和一批误判样例校准：
+正例的指令得分大多在 0.26 以上，而误判样例（如 "Generate a picture of my bank balance" 0.24、
+"Write a summary: Today we met…" 0.21）都低于 0.25。整句得分会被正文稀释，
+正例的整句得分在 0.12 以上，所以整句阈值单独设为 0.1。宁可多交给 ChatGPT，也不要选错模型。
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+# 哈希向量的维度
+DIM = 1 << 14
+
+DEFAULT_THRESHOLD = float(os.getenv("TASK_ROUTER_THRESHOLD", "0.25"))
+DEFAULT_FULL_THRESHOLD = float(os.getenv("TASK_ROUTER_FULL_THRESHOLD", "0.1"))
+DEFAULT_MARGIN = float(os.getenv("TASK_ROUTER_MARGIN", "0.05"))
+
+# info.json 只有英文描述，用户经常用中文下任务，这里补充每种任务常见的中文说法
+ROUTER_HINTS = {
+    "TextGeneration": ["写一个故事", "续写这段话", "帮我写一段文字", "生成一段产品描述", "创作一首诗", "写一篇文章", "write a poem about", "write a story about"],
+    "Summarization": ["总结这篇文章", "概括一下这段文字", "生成摘要", "提炼要点", "用几句话总结", "请总结以下内容", "总结一下", "summarize this text"],
+    "QuestionAnswering": ["根据上下文回答问题", "问题 上下文", "从这段文字里找出答案", "回答这个问题", "question context answer"],
+    "Translation": ["翻译成中文", "翻译成英文", "把这句话翻译一下", "译成法语", "translate to english", "translate into chinese"],
+    "TextToImage": ["生成一张图片", "画一幅画", "画一只猫", "生成图像", "给我画", "draw a picture of", "generate an image of"],
+    "FeatureExtraction": ["提取特征向量", "生成文本嵌入", "把这段文字转成向量", "计算向量表示", "embedding vector", "generate embeddings for", "get the embedding of"],
+}
+
+# 英文里太常见、对区分任务没有帮助的词
+STOPWORDS = {
+    "a", "an", "the", "this", "that", "these", "of", "for", "and", "or", "is", "are", "be", "can",
+    "to", "in", "on", "with", "me", "my", "i", "you", "your", "it", "its", "please", "some", "from",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[一-鿿]+")
+
+# mBART-50 语言代码
+LANGUAGES = {
+    "en_XX": ["english", "英文", "英语"],
+    "zh_CN": ["chinese", "mandarin", "中文", "汉语", "简体中文"],
+    "fr_XX": ["french", "法语", "法文"],
+    "de_DE": ["german", "德语", "德文"],
+    "es_XX": ["spanish", "西班牙语", "西班牙文"],
+    "ru_RU": ["russian", "俄语", "俄文"],
+    "ja_XX": ["japanese", "日语", "日文"],
+    "ko_KR": ["korean", "韩语", "韩文"],
+    "it_IT": ["italian", "意大利语"],
+    "pt_XX": ["portuguese", "葡萄牙语"],
+    "ar_AR": ["arabic", "阿拉伯语"],
+    "hi_IN": ["hindi", "印地语"],
+    "vi_VN": ["vietnamese", "越南语"],
+}
+_LANGUAGE_NAMES = sorted(
+    ((name, code) for code, names in LANGUAGES.items() for name in names),
+    key=lambda item: -len(item[0]),
+)
+_LANGUAGE_PATTERN = "|".join(re.escape(name) for name, _ in _LANGUAGE_NAMES)
+_TARGET_RE = re.compile(rf"(?:\b(?:to|into)\s+|成|为|到)({_LANGUAGE_PATTERN})", re.IGNORECASE)
+_SOURCE_RE = re.compile(rf"(?:\bfrom\s+|从)({_LANGUAGE_PATTERN})", re.IGNORECASE)
+_LANGUAGE_RE = re.compile(rf"({_LANGUAGE_PATTERN})", re.IGNORECASE)
+_LANGUAGE_CODES = {name: code for name, code in _LANGUAGE_NAMES}
+
+_QA_RE = re.compile(
+    r"(?:question|问题)\s*[:：]\s*(?P<question>.+?)\s*(?:context|上下文|背景)\s*[:：]\s*(?P<context>.+)",
+    re.IGNORECASE | re.DOTALL,
+)
+_QUOTED_RE = re.compile(r"[\"“「『'‘](.+?)[\"”」』'’]", re.DOTALL)
+
+
+def text_features(text: str):
+    """文本 -> 哈希特征 {下标: 次数}"""
+    text = text.lower()
+    feats = {}
+
+    def add(token):
+        idx = zlib.crc32(token.encode("utf-8")) & (DIM - 1)
+        feats[idx] = feats.get(idx, 0.0) + 1.0
+
+    words = [w for w in _WORD_RE.findall(text) if w not in STOPWORDS]
+    for i, word in enumerate(words):
+        add(word)
+        if len(word) > 5:
+            # 前 5 个字母当作粗略的词干：summarize / summary / summarization 都有 "summa"
+            add(word[:5] + "~")
+        if i:
+            add(words[i - 1] + " " + word)
+    for run in _CJK_RE.findall(text):
+        for i, ch in enumerate(run):
+            add(ch)
+            if i:
+                add(run[i - 1:i + 1])
+    return feats
+
+
+def embed(text: str) -> np.ndarray:
+    """文本 -> 单位长度的哈希向量"""
+    vec = np.zeros(DIM, dtype=np.float32)
+    for idx, count in text_features(text).items():
+        vec[idx] = count
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def detect_language(text: str) -> str:
+    """按文字种类粗略判断源语言"""
+    if re.search(r"[぀-ヿ]", text):
+        return "ja_XX"
+    if re.search(r"[가-힯]", text):
+        return "ko_KR"
+    if _CJK_RE.search(text):
+        return "zh_CN"
+    if re.search(r"[Ѐ-ӿ]", text):
+        return "ru_RU"
+    if re.search(r"[؀-ۿ]", text):
+        return "ar_AR"
+    return "en_XX"
+
+
+def mentioned_languages(text: str):
+    """文本里提到的语言（mBART 代码集合）"""
+    return {_LANGUAGE_CODES[m.group(1).lower()] for m in _LANGUAGE_RE.finditer(text)}
+
+
+def split_payload(task: str):
+    """
+    把任务描述拆成 (指令, 待处理文本)
+    例如 "Translate this to Chinese: Hello" -> ("Translate this to Chinese", "Hello")
+    没有冒号也没有引号时待处理文本为 None
+    """
+    match = re.search(r"[:：]", task)
+    if match:
+        payload = task[match.end():].strip()
+        if payload:
+            return task[:match.start()].strip(), payload
+    quoted = _QUOTED_RE.search(task)
+    if quoted and quoted.group(1).strip():
+        return (task[:quoted.start()] + task[quoted.end():]).strip(), quoted.group(1).strip()
+    return task.strip(), None
+
+
+class TaskRouter:
+    """最近质心分类器 + 置信度阈值"""
+
+    def __init__(
+        self,
+        model_info: dict,
+        threshold: float = DEFAULT_THRESHOLD,
+        margin: float = DEFAULT_MARGIN,
+        full_threshold: float = DEFAULT_FULL_THRESHOLD,
+    ):
+        self.threshold = threshold
+        self.full_threshold = full_threshold
+        self.margin = margin
+        self.task_types = list(model_info)
+        centroids = np.zeros((len(self.task_types), DIM), dtype=np.float32)
+        for i, task_type in enumerate(self.task_types):
+            info = model_info[task_type]
+            texts = [info.get("description", "")] + list(info.get("use_cases", [])) + list(info.get("examples", []))
+            texts += ROUTER_HINTS.get(task_type, [])
+            for text in texts:
+                centroids[i] += embed(text)
+            norm = np.linalg.norm(centroids[i])
+            if norm > 0:
+                centroids[i] /= norm
+        self.centroids = centroids
+
+    def scores(self, task: str) -> np.ndarray:
+        """任务和每个质心的余弦相似度（只取非零特征那几列，不构造完整向量）"""
+        feats = text_features(task)
+        if not feats:
+            return np.zeros(len(self.task_types), dtype=np.float32)
+        idx = np.fromiter(feats.keys(), dtype=np.int64, count=len(feats))
+        weights = np.fromiter(feats.values(), dtype=np.float32, count=len(feats))
+        weights /= np.linalg.norm(weights)
+        return self.centroids[:, idx] @ weights
+
+    def classify(self, task: str):
+        """返回 (任务类型, 最高分, 与第二名的差距)；不确定时任务类型为 None"""
+        scores = self.scores(task)
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else 0.0
+        if best < self.threshold or best - second < self.margin:
+            return None, best, best - second
+        return self.task_types[order[0]], best, best - second
+
+    def route(self, task: str):
+        """
+        返回与 select_model_with_gpt 相同格式的字典，额外带 "confidence"（指令部分的最高分），
+        调用方用完后应去掉它；不确定或参数取不出来时返回 None，由调用方交给 ChatGPT
+        """
+        # 有明确的待处理文本时只看指令部分，避免正文内容干扰分类
+        instruction, payload = split_payload(task)
+        task_type, confidence, _ = self.classify(instruction if payload and instruction else task)
+        if task_type is None:
+            return None
+        if payload and instruction:
+            # 整句也要和这个类型足够像，只是指令碰巧相似的任务交给 ChatGPT
+            if self.scores(task)[self.task_types.index(task_type)] < self.full_threshold:
+                return None
+        params = {}
+
+        if task_type in ("TextGeneration", "TextToImage", "FeatureExtraction"):
+            # 生成类任务的指令本身就是提示词的一部分（"Write a poem about: the sea"），整句都交给模型
+            prompt = task.strip()
+        elif task_type == "Summarization":
+            if not payload:
+                return None
+            prompt = payload
+        elif task_type == "Translation":
+            target = _TARGET_RE.search(instruction)
+            if not payload or not target:
+                return None
+            params["tgt_lang"] = _LANGUAGE_CODES[target.group(1).lower()]
+            source = _SOURCE_RE.search(instruction)
+            if source is None:
+                # "Convert this Spanish text to English"：指令里除目标语言外提到的另一种语言就是源语言
+                others = [m for m in _LANGUAGE_RE.finditer(instruction) if m.start() != target.start(1)]
+                source = others[0] if others else None
+            params["src_lang"] = _LANGUAGE_CODES[source.group(1).lower()] if source else detect_language(payload)
+            prompt = payload
+        elif task_type == "QuestionAnswering":
+            # 没有给出上下文时需要 ChatGPT 生成 context
+            match = _QA_RE.search(task)
+            if not match:
+                return None
+            params["question"] = match.group("question").strip()
+            params["context"] = match.group("context").strip()
+            prompt = params["question"]
+        else:
+            return None
+
+        return {"task_type": task_type, "prompt": prompt, "additional_params": params, "confidence": confidence}
+
+
+if __name__ == "__main__":
+    # 测试代码：python src/TaskRouter.py "Translate to Chinese: Hello"
+    import json
+    from pathlib import Path
+
+    with open(Path(__file__).parent.parent / "info.json", 'r', encoding='utf-8') as f:
+        router = TaskRouter(json.load(f))
+
+    tasks = [" ".join(sys.argv[1:])] if len(sys.argv) > 1 else [
+        "Translate to Chinese: Hello, how are you?",
+        "把下面这句话翻译成英文：今天天气很好",
+        "总结这篇文章：人工智能正在改变世界……",
+        "Draw a futuristic cityscape with flying cars",
+        "Question: What is the capital of France? Context: Paris is the capital of France.",
+        "帮我看看这个",
+    ]
+    for task in tasks:
+        start = time.perf_counter()
+        selection = router.route(task)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{task}\n  -> {selection if selection else '不确定，交给 ChatGPT'}  ({elapsed:.3f} ms)")
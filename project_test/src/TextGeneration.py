@@ -2,39 +2,60 @@
 
 import os
 import sys
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def textGeneration(prompt: str, model: str):
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=token,
-        timeout=30,
-    )
-    
-
     print(f"调用模型: {model}")
 
-    result = client.chat.completions.create(
-        model=model,
-            messages=[
-        {
-            "role": "user",
-            "content": prompt
-        }
-        ],
-    )
+    with inference_client("hf-inference", 30) as client:
+        result = client.chat.completions.create(
+            model=model,
+                messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+            ],
+        )
     output = result["choices"][0]["message"]["content"].strip()
     # print(f"结果:\n{output}")
 
     return output
 
+def textGenerationStream(prompt: str, model: str):
+    """
+    流式文本生成：模型每生成一段就 yield 一段文本
+    用法：
+        for piece in textGenerationStream(prompt, model):
+            print(piece, end="", flush=True)
+    """
+    print(f"调用模型: {model}（流式）")
+
+    # 要在 with 里把流读完，退出时才会释放这次请求的连接
+    with inference_client("hf-inference", 30) as client:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if piece:
+                yield piece
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         user_input = " ".join(sys.argv[1:])
@@ -3,13 +3,12 @@
 import os
 import sys
 from datetime import datetime
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def text_to_image(prompt: str, model: str = "black-forest-labs/FLUX.1-schnell", output_path: str = None):
@@ -31,21 +30,16 @@ def text_to_image(prompt: str, model: str = "black-forest-labs/FLUX.1-schnell",
         保存的图片路径
     """
     
-    client = InferenceClient(
-        provider="nebius",
-        api_key=token,
-        timeout=120,  # 图片生成可能需要更长时间
-    )
-    
     print(f"调用模型: {model}")
     print(f"提示词: {prompt}")
     print("正在生成图片，请稍候...")
     
     # output is a PIL.Image object
-    image = client.text_to_image(
-        prompt,
-        model=model,
-    )
+    with inference_client("nebius", 120) as client:  # 图片生成可能需要更长时间
+        image = client.text_to_image(
+            prompt,
+            model=model,
+        )
     
     # 如果没有指定输出路径，使用时间戳命名
     if output_path is None:
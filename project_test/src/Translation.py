@@ -2,13 +2,12 @@
 
 import os
 import sys
-from huggingface_hub import InferenceClient
 
-token = os.getenv("HUGGINGFACE_TOKEN")
+if __name__ == "__main__":
+    # 作为脚本运行时项目根目录不在 sys.path 上，补上后才能按 src.xxx 导入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if not token:
-    print("环境变量 HUGGINGFACE_TOKEN 未设置！")
-    sys.exit(1)
+from src.ClientPool import inference_client
 
 
 def translation(text: str, src_lang: str = "en_XX", tgt_lang: str = "zh_CN", model: str = "facebook/mbart-large-50-many-to-many-mmt"):
@@ -34,21 +33,15 @@ def translation(text: str, src_lang: str = "en_XX", tgt_lang: str = "zh_CN", mod
         翻译后的文本
     """ 
     
-    client = InferenceClient(
-        provider="hf-inference",
-        api_key=token,
-        timeout=30,
-    )
-    
-    
     print(f"调用模型: {model}")
     
-    result = client.translation(
-        text,
-        model=model,
-        src_lang=src_lang,
-        tgt_lang=tgt_lang
-    )
+    with inference_client("hf-inference", 30) as client:
+        result = client.translation(
+            text,
+            model=model,
+            src_lang=src_lang,
+            tgt_lang=tgt_lang
+        )
     
     # result 是一个包含翻译文本的对象
     translated_text = result.translation_text if hasattr(result, 'translation_text') else str(result)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+特征向量存储：把 feature_extraction 的结果以二进制追加到一个内存映射文件里
+
+目录结构（默认 vectors/）：
+    vectors.bin    所有向量按行首尾相接存放，float32 或 float16，每行 dim 个数
+    index.sqlite   表 vectors：id、起始行 start、行数 rows、原始形状、输入文本、附加信息、时间
+                   表 info：dim 和 dtype
+
+一条记录可以占多行（例如 bart-base 返回每个 token 一个向量），通过 start / rows 定位。
+读取时整个 vectors.bin 映射成 (总行数, dim) 的 numpy 数组，get() 返回的是它的切片，不复制数据。
+search() 对每条记录取各行的平均向量，和查询向量批量算余弦相似度。
+
+用法：
+    store = VectorStore("vectors")
+    vid = store.add(embedding, text="原文")
+    store.get(vid)                       # 零拷贝读回
+    store.search(query_vectors, top_k=5) # [[(id, score), ...], ...]
+
+可用环境变量调整：VECTOR_STORE=0 关闭、VECTOR_STORE_PATH（默认 vectors）、VECTOR_STORE_DTYPE（float32 / float16）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.ResultSink import new_id
+
+DTYPES = ("float32", "float16")
+
+
+class VectorStore:
+    """只追加的内存映射向量库，附带 id / 偏移索引和元数据表"""
+
+    def __init__(self, path="vectors", dtype: str = "float32", commit_every: int = 64):
+        if dtype not in DTYPES:
+            raise ValueError(f"不支持的 dtype: {dtype}（可选 {', '.join(DTYPES)}）")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self._conn = sqlite3.connect(str(self.path / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE, start INTEGER, rows INTEGER, "
+            "shape TEXT, text TEXT, meta TEXT, time TEXT)"
+        )
+        self._conn.commit()
+        info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+        # 已有的库沿用建库时的 dtype 和维度
+        self.dtype = np.dtype(info.get("dtype", dtype))
+        self.dim = int(info["dim"]) if "dim" in info else None
+
+        self._data = open(self.path / "vectors.bin", 'ab', buffering=0)
+        self._matrix = None
+        self._pooled = None
+        self.refresh()
+
+    # ---------- 索引 ----------
+
+    def refresh(self):
+        """从 index.sqlite 重新读取索引（其他进程追加过之后调用）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, start, rows, shape FROM vectors ORDER BY seq").fetchall()
+            self._ids = [r[0] for r in rows]
+            self._pos = {vid: i for i, vid in enumerate(self._ids)}
+            self._start = [r[1] for r in rows]
+            self._rows = [r[2] for r in rows]
+            self._shapes = [json.loads(r[3]) for r in rows]
+            self._pooled = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._pos
+
+    @property
+    def ids(self):
+        return list(self._ids)
+
+    # ---------- 写入 ----------
+
+    def _as_rows(self, vector) -> np.ndarray:
+        arr = np.asarray(vector, dtype=np.float32)
+        if arr.size == 0:
+            raise ValueError("向量为空")
+        dim = arr.shape[-1] if arr.ndim else 1
+        if self.dim is None:
+            self.dim = dim
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                [("dim", str(dim)), ("dtype", self.dtype.name)],
+            )
+            self._conn.commit()
+        elif dim != self.dim:
+            raise ValueError(f"向量维度 {dim} 与库中的维度 {self.dim} 不一致")
+        return arr.reshape(-1, self.dim)
+
+    def add_many(self, vectors, texts=None, metas=None):
+        """批量追加：所有向量一次写入数据文件，索引一个事务提交；返回 id 列表"""
+        vectors = list(vectors)
+        texts = list(texts) if texts is not None else [""] * len(vectors)
+        metas = list(metas) if metas is not None else [None] * len(vectors)
+        with self._lock:
+            blocks = [self._as_rows(v) for v in vectors]
+            if not blocks:
+                return []
+            data = np.concatenate(blocks).astype(self.dtype).tobytes()
+            # O_APPEND 写入后文件位置减去长度就是这批数据的起点，多个进程同时追加也不会错位
+            self._data.write(data)
+            row_bytes = self.dim * self.dtype.itemsize
+            start = (self._data.tell() - len(data)) // row_bytes
+
+            ids = []
+            records = []
+            now = datetime.now().isoformat(timespec="milliseconds")
+            for vector, block, text, meta in zip(vectors, blocks, texts, metas):
+                vid = new_id()
+                shape = list(np.shape(vector))
+                records.append((vid, int(start), len(block), json.dumps(shape), text,
+                                json.dumps(meta, ensure_ascii=False) if meta else None, now))
+                self._pos[vid] = len(self._ids)
+                self._ids.append(vid)
+                self._start.append(int(start))
+                self._rows.append(len(block))
+                self._shapes.append(shape)
+                ids.append(vid)
+                start += len(block)
+            self._conn.executemany(
+                "INSERT INTO vectors (id, start, rows, shape, text, meta, time) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._pending += len(records)
+            if self._pending >= self.commit_every:
+                self._commit()
+            self._pooled = None
+        return ids
+
+    def add(self, vector, text: str = "", meta: dict = None) -> str:
+        """追加一条向量，返回它的 id"""
+        return self.add_many([vector], [text], [meta])[0]
+
+    def _commit(self):
+        # 先让向量数据落盘，再提交引用它的索引
+        os.fsync(self._data.fileno())
+        self._conn.commit()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            if not self._data.closed:
+                self._commit()
+                self._data.close()
+                self._conn.close()
+
+    # ---------- 读取 ----------
+
+    def matrix(self) -> np.ndarray:
+        """整个数据文件映射成 (总行数, dim) 的只读数组；文件变长后重新映射"""
+        if self.dim is None:
+            return np.zeros((0, 0), dtype=self.dtype)
+        n_rows = os.path.getsize(self.path / "vectors.bin") // (self.dim * self.dtype.itemsize)
+        if self._matrix is None or self._matrix.shape[0] != n_rows:
+            if n_rows == 0:
+                return np.zeros((0, self.dim), dtype=self.dtype)
+            self._matrix = np.memmap(self.path / "vectors.bin", dtype=self.dtype, mode='r', shape=(n_rows, self.dim))
+        return self._matrix
+
+    def get(self, vector_id: str) -> np.ndarray:
+        """按 id 读回向量（内存映射的切片，不复制数据），形状是写入时的形状"""
+        i = self._pos[vector_id]
+        start, rows = self._start[i], self._rows[i]
+        return self.matrix()[start:start + rows].reshape(self._shapes[i])
+
+    def metadata(self, vector_id: str) -> dict:
+        row = self._conn.execute(
+            "SELECT id, start, rows, shape, text, meta, time FROM vectors WHERE id = ?", (vector_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(vector_id)
+        return {
+            "id": row[0],
+            "start": row[1],
+            "rows": row[2],
+            "shape": json.loads(row[3]),
+            "text": row[4],
+            "meta": json.loads(row[5]) if row[5] else None,
+            "time": row[6],
+        }
+
+    def pooled(self) -> np.ndarray:
+        """每条记录各行的平均向量，(记录数, dim) float32；库不变时缓存"""
+        if self._pooled is not None:
+            return self._pooled
+        matrix = self.matrix()
+        if not len(self._ids):
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        start = np.asarray(self._start, dtype=np.int64)
+        rows = np.asarray(self._rows, dtype=np.int64)
+        if np.all(rows == 1):
+            pooled = np.asarray(matrix[start], dtype=np.float32)
+        else:
+            # 每条记录是连续的一段行：reduceat 用 [起点, 终点, 起点, 终点, ...] 求每段的和，取偶数位
+            order = np.argsort(start)
+            starts, ends = start[order], start[order] + rows[order]
+            bounds = np.empty(2 * len(order), dtype=np.int64)
+            bounds[0::2], bounds[1::2] = starts, ends
+            if bounds[-1] >= matrix.shape[0]:
+                bounds = bounds[:-1]
+            sums = np.add.reduceat(np.asarray(matrix, dtype=np.float32), bounds, axis=0)[0::2]
+            pooled = np.empty_like(sums)
+            pooled[order] = sums / rows[order][:, None]
+        self._pooled = pooled
+        return pooled
+
+    def search(self, queries, top_k: int = 5):
+        """
+        批量相似度查询：queries 为 (dim,) 或 (n, dim)
+        返回每个查询的 [(id, 余弦相似度), ...]，按相似度从高到低
+        """
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        pooled = self.pooled()
+        if not len(pooled):
+            return [[] for _ in range(q.shape[0])]
+        q_norm = np.linalg.norm(q, axis=1, keepdims=True)
+        p_norm = np.linalg.norm(pooled, axis=1)
+        scores = (q / np.where(q_norm > 0, q_norm, 1)) @ (pooled / np.where(p_norm > 0, p_norm, 1)[:, None]).T
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, cand in zip(scores, top):
+            cand = cand[np.argsort(-row[cand], kind="stable")]
+            results.append([(self._ids[i], float(row[i])) for i in cand])
+        return results
+
+
+def open_vector_store():
+    """按环境变量打开向量库；VECTOR_STORE=0 时返回 None"""
+    if os.getenv("VECTOR_STORE", "1").strip() == "0":
+        return None
+    return VectorStore(
+        os.getenv("VECTOR_STORE_PATH", "").strip() or "vectors",
+        dtype=os.getenv("VECTOR_STORE_DTYPE", "float32").strip() or "float32",
+    )